@@ -0,0 +1,223 @@
+import hashlib
+import time
+from functools import wraps
+from http import HTTPStatus
+from urllib.parse import urlencode
+
+from django import shortcuts
+from django.core.cache import cache
+from django.http import Http404
+from django.utils.cache import patch_response_headers, patch_vary_headers
+
+CONTENT_VERSION_KEY = 'core:content_version'
+ANONYMOUS_PAGE_KEY = 'core:anonymous_page:{prefix}:{digest}'
+LAST_PAGE_KEY = 'core:last_page:{prefix}:{path}'
+STATS_KEY = 'core:cache_stats:{prefix}:{counter}'
+STATS_COUNTERS = ('hits', 'misses', 'normalized')
+PAGE_PARAM = 'page'
+MISSING_KEY = 'core:missing:{label}:{field}:{digest}'
+MISSING_TIMEOUT = 60
+
+cached_page_prefixes = set()
+
+
+def get_content_version():
+    """Возвращает текущую версию общего контента для ключей кэша."""
+    version = cache.get(CONTENT_VERSION_KEY)
+    if version is None:
+        version = int(time.time() * 1000)
+        if not cache.add(CONTENT_VERSION_KEY, version, None):
+            version = cache.get(CONTENT_VERSION_KEY, version)
+    return version
+
+
+def bump_content_version():
+    """Инвалидирует все фрагменты, построенные на общем контенте."""
+    try:
+        cache.incr(CONTENT_VERSION_KEY)
+    except ValueError:
+        cache.set(CONTENT_VERSION_KEY, int(time.time() * 1000), None)
+
+
+def incr_counter(key, delta=1):
+    cache.add(key, 0, None)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        cache.set(key, delta, None)
+        return delta
+
+
+def record_stat(key_prefix, counter):
+    incr_counter(STATS_KEY.format(prefix=key_prefix, counter=counter))
+
+
+def get_stats(key_prefix):
+    """Возвращает счётчики попаданий и промахов кэша страницы."""
+    keys = {
+        counter: STATS_KEY.format(prefix=key_prefix, counter=counter)
+        for counter in STATS_COUNTERS
+    }
+    values = cache.get_many(keys.values())
+    return {
+        counter: values.get(key, 0) for counter, key in keys.items()
+    }
+
+
+def reset_stats(key_prefix):
+    cache.delete_many([
+        STATS_KEY.format(prefix=key_prefix, counter=counter)
+        for counter in STATS_COUNTERS
+    ])
+
+
+def canonical_page(value, last_page=None):
+    """
+    Приводит номер страницы к виду, который отдаст Paginator.get_page.
+
+    Возвращает None, если номер вне диапазона, а последняя страница
+    ещё неизвестна.
+    """
+    if value is None:
+        return 1
+    try:
+        number = int(value)
+    except ValueError:
+        return 1
+    if 1 <= number and (last_page is None or number <= last_page):
+        return number
+    return last_page
+
+
+def canonical_query(request, query_params, last_page):
+    """Оставляет в запросе только параметры, влияющие на страницу."""
+    query = {}
+    for param in query_params:
+        value = request.GET.get(param)
+        if param == PAGE_PARAM:
+            value = canonical_page(value, last_page)
+            if value is None:
+                return None
+        if value is not None:
+            query[param] = value
+    return query
+
+
+def anonymous_page_key(key_prefix, path, query):
+    digest = hashlib.md5(
+        f'{path}?{urlencode(sorted(query.items()))}'.encode()
+    ).hexdigest()
+    return ANONYMOUS_PAGE_KEY.format(prefix=key_prefix, digest=digest)
+
+
+def anonymous_cache_page(timeout, key_prefix='', query_params=(PAGE_PARAM,)):
+    """
+    Кэширует страницу целиком, но только для анонимных пользователей.
+
+    Страница гостя не зависит от cookie, поэтому одна запись в кэше
+    обслуживает всех гостей. Ключ строится по пути и нормализованным
+    параметрам из query_params: остальные параметры отбрасываются,
+    а номер страницы приводится к тому, что реально отдаёт пагинатор.
+    Авторизованные пользователи получают страницу с персональной шапкой,
+    а общая часть берётся из кэша фрагментов шаблона.
+    """
+    cached_page_prefixes.add(key_prefix)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (
+                request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated
+            ):
+                return view(request, *args, **kwargs)
+            last_page_key = LAST_PAGE_KEY.format(
+                prefix=key_prefix, path=request.path
+            )
+            query = canonical_query(
+                request, query_params, cache.get(last_page_key)
+            )
+            if query is not None:
+                raw_query = request.GET.dict()
+                if raw_query and raw_query != {
+                    param: str(value) for param, value in query.items()
+                }:
+                    record_stat(key_prefix, 'normalized')
+                key = anonymous_page_key(key_prefix, request.path, query)
+                response = cache.get(key)
+                if response is not None:
+                    record_stat(key_prefix, 'hits')
+                    return response
+            record_stat(key_prefix, 'misses')
+            response = view(request, *args, **kwargs)
+            if (
+                request.method != 'GET'
+                or response.status_code != HTTPStatus.OK
+                or response.cookies
+            ):
+                return response
+            context = getattr(response, 'context_data', None) or {}
+            page_obj = context.get('page_obj')
+            if page_obj is not None:
+                num_pages = page_obj.paginator.num_pages
+                cache.set(last_page_key, num_pages, timeout)
+                query = canonical_query(request, query_params, num_pages)
+                query[PAGE_PARAM] = page_obj.number
+            if query is None:
+                return response
+            key = anonymous_page_key(key_prefix, request.path, query)
+            return store_response(response, key, timeout)
+        return wrapper
+    return decorator
+
+
+def store_response(response, key, timeout):
+    patch_response_headers(response, timeout)
+    patch_vary_headers(response, ('Cookie',))
+    if hasattr(response, 'render') and callable(response.render):
+        response.add_post_render_callback(
+            lambda r: cache.set(key, r, timeout)
+        )
+    else:
+        cache.set(key, response, timeout)
+    return response
+
+
+class CachedMiss(Http404):
+    """Объект уже известен как отсутствующий, база не запрашивалась."""
+
+
+def missing_key(model, field, value):
+    digest = hashlib.md5(str(value).encode()).hexdigest()
+    return MISSING_KEY.format(
+        label=model._meta.label_lower, field=field, digest=digest
+    )
+
+
+def get_cached_object_or_404(klass, **lookup):
+    """
+    Как django.shortcuts.get_object_or_404, но запоминает промахи.
+
+    Поиск ведётся по одному полю. Несуществующее значение ненадолго
+    кэшируется, и повторные запросы получают CachedMiss без обращения
+    к базе.
+    """
+    model = getattr(klass, 'model', klass)
+    (field, value), = lookup.items()
+    key = missing_key(model, field, value)
+    if cache.get(key):
+        raise CachedMiss(f'{model._meta.object_name} не найден.')
+    try:
+        return shortcuts.get_object_or_404(klass, **lookup)
+    except Http404:
+        cache.set(key, True, MISSING_TIMEOUT)
+        raise
+
+
+def forget_missing(instance, *fields):
+    """Снимает отметку об отсутствии для полей созданного объекта."""
+    model = type(instance)
+    cache.delete_many([
+        missing_key(model, field, getattr(instance, field))
+        for field in fields
+    ])
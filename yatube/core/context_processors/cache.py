@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from core.cache import get_content_version
+
+
+def fragment_cache(request):
+    """Добавляет таймаут и версию контента для кэша фрагментов."""
+    return {
+        'fragment_cache_timeout': settings.FRAGMENT_CACHE_TIMEOUT,
+        'content_version': SimpleLazyObject(get_content_version),
+    }
@@ -0,0 +1,32 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.cache import cached_page_prefixes, get_stats, reset_stats
+
+
+class Command(BaseCommand):
+    help = 'Показывает долю попаданий в кэш страниц для гостей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Обнулить счётчики после вывода.',
+        )
+
+    def handle(self, *args, **options):
+        import_module(settings.ROOT_URLCONF)
+        for key_prefix in sorted(cached_page_prefixes):
+            stats = get_stats(key_prefix)
+            total = stats['hits'] + stats['misses']
+            hit_rate = stats['hits'] / total if total else 0
+            self.stdout.write(
+                f'{key_prefix}: попаданий {stats["hits"]}, '
+                f'промахов {stats["misses"]}, '
+                f'нормализовано {stats["normalized"]}, '
+                f'доля попаданий {hit_rate:.1%}'
+            )
+            if options['reset']:
+                reset_stats(key_prefix)
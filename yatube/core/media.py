@@ -0,0 +1,142 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+def media_path(path):
+    """
+    Путь к медиафайлу, который разрешено отдавать.
+
+    Отдаются только картинки из MEDIA_SERVED_PREFIXES: счётчики ссылок,
+    временные файлы загрузки и всё вне MEDIA_ROOT остаются закрытыми.
+    """
+    content_type, _ = mimetypes.guess_type(path)
+    if (
+        not path.startswith(tuple(settings.MEDIA_SERVED_PREFIXES))
+        or any(part.startswith('.') for part in path.split('/'))
+        or not content_type
+        or not content_type.startswith('image/')
+    ):
+        raise Http404
+    try:
+        return safe_join(settings.MEDIA_ROOT, path), content_type
+    except SuspiciousFileOperation:
+        raise Http404
+
+
+def parse_range(header, size):
+    """
+    Разбирает заголовок Range с одним диапазоном байт.
+
+    Возвращает None, если диапазон не задан или не поддерживается,
+    тогда файл отдаётся целиком.
+    """
+    match = RANGE_RE.match(header)
+    if match is None:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def read_range(file, length):
+    with file:
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def file_response(request, full_path, size, content_type):
+    """Отдаёт файл сам, с поддержкой одного диапазона байт."""
+    try:
+        byte_range = parse_range(request.META.get('HTTP_RANGE', ''), size)
+    except RangeNotSatisfiable:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    file = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        file.seek(start)
+        response = StreamingHttpResponse(
+            read_range(file, end - start + 1),
+            status=206,
+            content_type=content_type,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Отдаёт медиафайл после проверок в Django.
+
+    Если перед приложением стоит nginx или Apache (MEDIA_SENDFILE),
+    сами байты, включая диапазоны, отдаёт он по X-Accel-Redirect
+    или X-Sendfile, а воркер только отвечает заголовками.
+    Имена картинок и миниатюр строятся из хэшей, поэтому файл
+    по одному адресу не меняется и кэшируется навсегда.
+    """
+    full_path, content_type = media_path(path)
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404
+    if not was_modified_since(
+        request.META.get('HTTP_IF_MODIFIED_SINCE'),
+        stat.st_mtime,
+        stat.st_size,
+    ):
+        response = HttpResponseNotModified()
+    elif settings.MEDIA_SENDFILE == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_ACCEL_LOCATION + quote(path)
+        )
+    elif settings.MEDIA_SENDFILE == 'apache':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+    else:
+        response = file_response(
+            request, full_path, stat.st_size, content_type
+        )
+    if response.status_code < 400:
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Cache-Control'] = CACHE_CONTROL
+    return response
@@ -0,0 +1,247 @@
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404
+from django.template import engines
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_safe
+
+from core.media import CACHE_CONTROL
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.svg', '.ico', '.txt', '.json', '.xml', '.html',
+)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+UNHASHED_CACHE_CONTROL = 'public, max-age=600'
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+CLASS_RE = re.compile(r'\.(-?[_a-zA-Z][\w-]*)')
+ATTRIBUTE_RE = re.compile(r'\[[^\]]*\]')
+TOKEN_RE = re.compile(r'[\w-]+')
+NESTED_AT_RULES = ('@media', '@supports')
+
+
+def used_tokens():
+    """Все слова из шаблонов проекта: среди них все используемые классы."""
+    tokens = set()
+    for engine in engines.all():
+        for directory in engine.template_dirs:
+            for root, _, filenames in os.walk(directory):
+                for filename in filenames:
+                    path = os.path.join(root, filename)
+                    with open(path, encoding='utf-8') as template:
+                        tokens.update(TOKEN_RE.findall(template.read()))
+    return tokens
+
+
+def skip_string(css, index):
+    """Индекс сразу за строкой в кавычках, начинающейся в index."""
+    quote = css[index]
+    index += 1
+    while index < len(css) and css[index] != quote:
+        index += 2 if css[index] == '\\' else 1
+    return index + 1
+
+
+def structural_tokens(css):
+    """Скобки, точки с запятой и комментарии вне строк с их позициями."""
+    index = 0
+    while index < len(css):
+        if css[index] in '"\'':
+            index = skip_string(css, index)
+        elif css.startswith('/*', index):
+            end = css.find('*/', index + 2)
+            end = len(css) if end == -1 else end + 2
+            yield '/*', index, end
+            index = end
+        else:
+            if css[index] in '{};':
+                yield css[index], index, index + 1
+            index += 1
+
+
+def split_blocks(css):
+    """
+    Делит CSS на правила верхнего уровня.
+
+    Возвращает пары (прелюдия, тело); у инструкций вроде @charset тела
+    нет. Из комментариев верхнего уровня сохраняются только /*! */
+    с лицензией.
+    """
+    blocks = []
+    start = depth = 0
+    for token, index, end in structural_tokens(css):
+        if token == '/*':
+            if depth == 0 and not css[start:index].strip():
+                if css.startswith('/*!', index):
+                    blocks.append((css[index:end], None))
+                start = end
+        elif token == '{':
+            if depth == 0:
+                prelude, body_start = css[start:index].strip(), end
+            depth += 1
+        elif token == '}':
+            depth -= 1
+            if depth == 0:
+                blocks.append((prelude, css[body_start:index]))
+                start = end
+        elif depth == 0:
+            blocks.append((css[start:end].strip(), None))
+            start = end
+    return blocks
+
+
+def split_selectors(prelude):
+    selectors, start, depth = [], 0, 0
+    for index, char in enumerate(prelude):
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            selectors.append(prelude[start:index])
+            start = index + 1
+    selectors.append(prelude[start:])
+    return selectors
+
+
+def selector_is_used(selector, used):
+    classes = CLASS_RE.findall(ATTRIBUTE_RE.sub('', selector))
+    return all(name in used for name in classes)
+
+
+def prune_css(css, used):
+    """Убирает правила, все классы которых не встречаются в used."""
+    rules = []
+    for prelude, body in split_blocks(css):
+        if body is None:
+            rules.append(prelude)
+        elif prelude.startswith(NESTED_AT_RULES):
+            inner = prune_css(body, used)
+            if inner:
+                rules.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@'):
+            rules.append(f'{prelude}{{{body}}}')
+        else:
+            selectors = [
+                selector for selector in split_selectors(prelude)
+                if selector_is_used(selector, used)
+            ]
+            if selectors:
+                rules.append(f'{",".join(selectors)}{{{body}}}')
+    return ''.join(rules)
+
+
+def compressors():
+    yield '.gz', lambda content: gzip.compress(content, 9, mtime=0)
+    if brotli is not None:
+        yield '.br', brotli.compress
+
+
+class PrecompressedManifestStorage(ManifestStaticFilesStorage):
+    """
+    Статика с хэшем содержимого в имени и заранее сжатыми копиями.
+
+    При collectstatic стили из STATIC_PRUNED_CSS очищаются от правил
+    для классов, которых нет в шаблонах, до того как посчитан хэш,
+    а рядом с каждым текстовым файлом кладутся .gz и, если установлен
+    пакет brotli, .br. Без манифеста, то есть до первого collectstatic,
+    файлы отдаются под исходными именами.
+    """
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            paths = self.prune(paths)
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in paths:
+            self.compress(name)
+            self.compress(self.stored_name(name))
+
+    def prune(self, paths):
+        paths = dict(paths)
+        used = used_tokens()
+        for name in settings.STATIC_PRUNED_CSS:
+            if name not in paths:
+                continue
+            storage, path = paths[name]
+            with storage.open(path) as original:
+                css = original.read().decode()
+            self.replace(name, prune_css(css, used).encode())
+            paths[name] = (self, name)
+        return paths
+
+    def compress(self, name):
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+            return
+        with self.open(name) as original:
+            content = original.read()
+        for suffix, compress in compressors():
+            compressed = compress(content)
+            if len(compressed) < len(content):
+                self.replace(name + suffix, compressed)
+
+    def replace(self, name, content):
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(content))
+
+
+def accepted_encodings(header):
+    encodings = set()
+    for part in header.split(','):
+        encoding, _, params = part.strip().partition(';')
+        if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00'):
+            encodings.add(encoding.strip().lower())
+    return encodings
+
+
+@require_safe
+def serve_static(request, path):
+    """
+    Отдаёт собранную статику, выбирая сжатую копию по Accept-Encoding.
+
+    Файлы с хэшем в имени кэшируются навсегда, остальные ненадолго.
+    """
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    content_type, _ = mimetypes.guess_type(full_path)
+    accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    served, content_encoding = full_path, None
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted and os.path.isfile(full_path + suffix):
+            served, content_encoding = full_path + suffix, encoding
+            break
+    response = FileResponse(
+        open(served, 'rb'),
+        content_type=content_type or 'application/octet-stream',
+    )
+    if content_encoding:
+        response['Content-Encoding'] = content_encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if HASHED_NAME_RE.search(path):
+        response['Cache-Control'] = CACHE_CONTROL
+    else:
+        response['Cache-Control'] = UNHASHED_CACHE_CONTROL
+    return response
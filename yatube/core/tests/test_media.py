@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import Client, TestCase, override_settings
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+CONTENT = b'0123456789'
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ServeMediaTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts', 'ab'))
+        for name in ('ab/image.jpg', 'ab/image.jpg.refs'):
+            with open(os.path.join(TEMP_MEDIA_ROOT, 'posts', name), 'wb') as f:
+                f.write(CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_image_is_served_with_long_cache(self):
+        response = self.client.get('/media/posts/ab/image.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_range_request(self):
+        response = self.client.get(
+            '/media/posts/ab/image.jpg', HTTP_RANGE='bytes=2-4'
+        )
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'234')
+        self.assertEqual(response['Content-Range'], 'bytes 2-4/10')
+        response = self.client.get(
+            '/media/posts/ab/image.jpg', HTTP_RANGE='bytes=20-'
+        )
+        self.assertEqual(response.status_code, 416)
+
+    @override_settings(MEDIA_SENDFILE='nginx')
+    def test_bytes_are_delegated_to_proxy(self):
+        """С nginx воркер отдаёт только заголовки."""
+        response = self.client.get('/media/posts/ab/image.jpg')
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            '/protected-media/posts/ab/image.jpg',
+        )
+        self.assertEqual(response.content, b'')
+
+    def test_private_files_are_hidden(self):
+        for url in (
+            '/media/posts/ab/image.jpg.refs',
+            '/media/posts/ab/missing.jpg',
+            '/media/other/image.jpg',
+            '/media/posts/../posts/ab/image.jpg',
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
@@ -0,0 +1,68 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, override_settings
+
+from ..staticfiles import prune_css
+
+TEMP_STATIC_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class PruneCssTests(SimpleTestCase):
+    def test_unused_rules_are_removed(self):
+        css = (
+            '@charset "UTF-8";:root{--x:1}body{margin:0}'
+            '.card,.modal{padding:0}.modal-body{margin:0}'
+            '@media (min-width:576px){.modal{width:1px}.card{width:2px}}'
+            '@media print{.toast{display:none}}'
+        )
+        self.assertEqual(
+            prune_css(css, {'card'}),
+            '@charset "UTF-8";:root{--x:1}body{margin:0}.card{padding:0}'
+            '@media (min-width:576px){.card{width:2px}}',
+        )
+
+
+@override_settings(STATIC_ROOT=TEMP_STATIC_ROOT)
+class PrecompressedStaticTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with override_settings(STATIC_ROOT=TEMP_STATIC_ROOT):
+            call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(TEMP_STATIC_ROOT, 'staticfiles.json')) as f:
+            cls.css = json.load(f)['paths']['css/bootstrap.min.css']
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_STATIC_ROOT, ignore_errors=True)
+
+    def test_bootstrap_is_pruned_and_compressed(self):
+        original = os.path.join(
+            settings.BASE_DIR, 'static', 'css', 'bootstrap.min.css'
+        )
+        collected = os.path.join(TEMP_STATIC_ROOT, self.css)
+        self.assertLess(
+            os.path.getsize(collected), os.path.getsize(original) / 2
+        )
+        self.assertTrue(os.path.exists(collected + '.gz'))
+
+    def test_compressed_variant_is_served(self):
+        """Сжатая копия отдаётся по Accept-Encoding и кэшируется навсегда."""
+        response = Client().get(
+            settings.STATIC_URL + self.css, HTTP_ACCEPT_ENCODING='gzip, br'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        response = Client().get(
+            settings.STATIC_URL + self.css, HTTP_ACCEPT_ENCODING='identity'
+        )
+        self.assertFalse(response.has_header('Content-Encoding'))
@@ -1,7 +1,40 @@
+from django.core.cache import cache
+from django.http import HttpResponseNotFound
 from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.html import escape
+
+from core.cache import CachedMiss
+from core.context_processors.year import year
+
+NOT_FOUND_BODY_KEY = 'core:not_found_body'
+NOT_FOUND_BODY_TIMEOUT = 60 * 60
+PATH_PLACEHOLDER = '__not_found_path__'
+
+
+def prerendered_not_found(request):
+    """
+    Отдаёт заранее отрисованную гостевую страницу 404.
+
+    В ней шапка гостя, поэтому годится только для анонимных запросов.
+    """
+    body = cache.get(NOT_FOUND_BODY_KEY)
+    if body is None:
+        body = render_to_string(
+            'core/404.html', {'path': PATH_PLACEHOLDER, **year(request)}
+        )
+        cache.set(NOT_FOUND_BODY_KEY, body, NOT_FOUND_BODY_TIMEOUT)
+    return HttpResponseNotFound(
+        body.replace(PATH_PLACEHOLDER, escape(request.path))
+    )
 
 
 def page_not_found(request, exception):
+    if (
+        isinstance(exception, CachedMiss)
+        and not request.user.is_authenticated
+    ):
+        return prerendered_not_found(request)
     return render(request, 'core/404.html', {'path': request.path}, status=404)
 
 
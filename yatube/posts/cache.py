@@ -0,0 +1,67 @@
+from django.core.cache import cache
+
+from .models import Follow, Post
+from .rows import FeedRows
+from .utils import MAX_POSTS
+
+FOLLOW_FEED_KEY = 'posts:follow_feed:v3:{user_id}'
+FOLLOW_FEED_PAGES = 5
+FOLLOW_FEED_TIMEOUT = 60 * 15
+
+
+class FollowFeed:
+    """
+    Лента подписок, первые страницы которой хранятся в кэше.
+
+    В кэше лежат только id постов, на один больше, чем помещается
+    на закэшированные страницы: лишний говорит, что лента длиннее.
+    Посты страницы поднимаются из id одним in_bulk, а страницы дальше
+    закэшированных читаются из базы. Лента листается без подсчёта
+    (pages с HAS_NEXT), поэтому общее число постов не хранится.
+    """
+
+    size = MAX_POSTS * FOLLOW_FEED_PAGES
+
+    def __init__(self, user):
+        self.post_list = FeedRows(
+            Post.objects.filter(author__following__user=user)
+        )
+        key = FOLLOW_FEED_KEY.format(user_id=user.pk)
+        self.ids = cache.get(key)
+        if self.ids is None:
+            self.ids = list(
+                self.post_list.queryset.values_list(
+                    'pk', flat=True
+                )[:self.size + 1]
+            )
+            cache.set(key, self.ids, FOLLOW_FEED_TIMEOUT)
+
+    def count(self):
+        if len(self.ids) <= self.size:
+            return len(self.ids)
+        return self.post_list.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        beyond_cache = index.stop is None or index.stop > len(self.ids)
+        if beyond_cache and len(self.ids) > self.size:
+            return list(self.post_list[index])
+        ids = self.ids[index]
+        posts = self.post_list.in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+def invalidate_follow_feeds(user_ids):
+    cache.delete_many([
+        FOLLOW_FEED_KEY.format(user_id=user_id) for user_id in user_ids
+    ])
+
+
+def invalidate_followers_feeds(author_id):
+    """Сбрасывает ленты всех подписчиков автора."""
+    invalidate_follow_feeds(
+        Follow.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True)
+    )
@@ -0,0 +1,87 @@
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+
+COUNT_KEY = 'posts:count:{scope}'
+CACHED_COUNT_TIMEOUT = 60 * 5
+MAINTAINED_COUNT_TIMEOUT = 60 * 60 * 24
+ALL_SCOPE = 'all'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+class ExactCount:
+    """SELECT COUNT(*) на каждый показ страницы."""
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    def count(self):
+        return self.queryset.count()
+
+
+class CachedCount(ExactCount):
+    """Точное число из кэша, которое сигналы сбрасывают при изменениях."""
+
+    timeout = CACHED_COUNT_TIMEOUT
+
+    def __init__(self, queryset, scope):
+        super().__init__(queryset)
+        self.key = COUNT_KEY.format(scope=scope)
+
+    def count(self):
+        return cache.get_or_set(self.key, super().count, self.timeout)
+
+
+class MaintainedCount(CachedCount):
+    """
+    Счётчик в кэше, который сигналы увеличивают и уменьшают на месте.
+
+    COUNT(*) выполняется, только когда счётчик выпал из кэша, а раз
+    в сутки он пересчитывается, чтобы не копить расхождения от
+    массовых операций в обход сигналов.
+    """
+
+    timeout = MAINTAINED_COUNT_TIMEOUT
+
+
+class EstimatedCount(ExactCount):
+    """
+    Примерное число строк таблицы по статистике SQLite.
+
+    sqlite_stat1 заполняет ANALYZE, поэтому число отстаёт от реального.
+    Годится только для выборок без фильтров; если статистики нет,
+    считает точно.
+    """
+
+    def count(self):
+        if connection.vendor == 'sqlite':
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'SELECT stat FROM sqlite_stat1 WHERE tbl = %s',
+                        [self.queryset.model._meta.db_table],
+                    )
+                    row = cursor.fetchone()
+            except DatabaseError:
+                row = None
+            if row:
+                return int(row[0].split()[0])
+        return super().count()
+
+
+def forget_counts(*scopes):
+    cache.delete_many([COUNT_KEY.format(scope=scope) for scope in scopes])
+
+
+def adjust_count(scope, delta):
+    """Сдвигает поддерживаемый счётчик, если он сейчас есть в кэше."""
+    try:
+        cache.incr(COUNT_KEY.format(scope=scope), delta)
+    except ValueError:
+        pass
@@ -0,0 +1,82 @@
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Follow, FollowStats
+
+FOLLOWING_KEY = 'posts:following:{user_id}'
+FOLLOWING_TIMEOUT = 60 * 60
+
+
+def following_ids(user):
+    """
+    Множество id авторов, на которых подписан пользователь.
+
+    Хранится в кэше и сбрасывается сигналами при подписке и отписке.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    return cache.get_or_set(
+        FOLLOWING_KEY.format(user_id=user.pk),
+        lambda: frozenset(
+            Follow.objects.filter(user=user).values_list(
+                'author_id', flat=True
+            )
+        ),
+        FOLLOWING_TIMEOUT,
+    )
+
+
+def forget_following(user_id):
+    cache.delete(FOLLOWING_KEY.format(user_id=user_id))
+
+
+def is_following(user, authors):
+    """
+    Id тех авторов из списка, на которых подписан user.
+
+    Проверяется по закэшированному множеству, без запроса на автора.
+    """
+    ids = following_ids(user)
+    return {author.pk for author in authors if author.pk in ids}
+
+
+def follow(user, author):
+    """
+    Подписывает user на author, повторная подписка ничего не делает.
+
+    Возвращает True, если подписка появилась. Дубли отсекает
+    уникальное ограничение в базе, а не проверка перед вставкой.
+    """
+    if user.pk == author.pk:
+        return False
+    try:
+        with transaction.atomic():
+            Follow.objects.create(user=user, author=author)
+    except IntegrityError:
+        return False
+    return True
+
+
+def unfollow(user, author):
+    deleted, _ = Follow.objects.filter(user=user, author=author).delete()
+    return bool(deleted)
+
+
+def follow_stats(user):
+    try:
+        return user.follow_stats
+    except FollowStats.DoesNotExist:
+        return FollowStats(user=user)
+
+
+def adjust_stats(user_id, field, delta):
+    """Сдвигает счётчик, создавая строку статистики при первой подписке."""
+    stats = FollowStats.objects.filter(user_id=user_id)
+    if stats.update(**{field: F(field) + delta}) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            FollowStats.objects.create(user_id=user_id, **{field: delta})
+    except IntegrityError:
+        stats.update(**{field: F(field) + delta})
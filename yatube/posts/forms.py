@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from .images import is_too_large, make_placeholder, normalize_image
 from .models import Comment, Post
 
 
@@ -8,6 +10,41 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image',)
 
+    def clean_image(self):
+        """
+        Нормализует новую картинку и запоминает её размеры, формат, вес
+        и заглушку.
+
+        Слишком большие по числу пикселей картинки отклоняются по
+        заголовку, до декодирования.
+        """
+        image = self.cleaned_data.get('image')
+        if image is False:
+            self.set_image_meta(None, None, '', None, '')
+        elif isinstance(image, UploadedFile):
+            if is_too_large(*image.image.size):
+                raise forms.ValidationError(
+                    'Картинка слишком большая, загрузите поменьше.'
+                )
+            try:
+                image, (width, height), image_format = normalize_image(image)
+                placeholder = make_placeholder(image)
+            except (OSError, ValueError):
+                raise forms.ValidationError(
+                    'Не удалось обработать картинку.'
+                )
+            self.set_image_meta(
+                width, height, image_format, image.size, placeholder
+            )
+        return image
+
+    def set_image_meta(self, width, height, image_format, size, placeholder):
+        self.instance.image_width = width
+        self.instance.image_height = height
+        self.instance.image_format = image_format or ''
+        self.instance.image_size = size
+        self.instance.image_placeholder = placeholder
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
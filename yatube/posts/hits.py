@@ -0,0 +1,94 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+
+from .models import Post
+
+# Каждый пост - три параметра запроса: SQLite позволяет не больше 999.
+FLUSH_BATCH_SIZE = 300
+
+logger = logging.getLogger(__name__)
+lock = threading.Lock()
+pending = Counter()
+last_flush = time.monotonic()
+
+
+def record_view(post_id):
+    """
+    Засчитывает просмотр поста в памяти процесса.
+
+    Раз в VIEW_FLUSH_INTERVAL секунд накопленное записывает в базу
+    тот запрос, на котором интервал истёк. Если база занята, просмотры
+    возвращаются в счётчик до следующего сброса, а страница всё равно
+    отдаётся. Просмотры, не дошедшие до базы при падении процесса,
+    теряются: это цена отказа от UPDATE на каждый просмотр.
+    """
+    global last_flush
+    now = time.monotonic()
+    with lock:
+        pending[post_id] += 1
+        due = now - last_flush >= settings.VIEW_FLUSH_INTERVAL
+        if due:
+            last_flush = now
+    if not due:
+        return
+    views = take_pending()
+    try:
+        write_views(views)
+    except DatabaseError:
+        with lock:
+            pending.update(views)
+        logger.exception('Не удалось записать просмотры постов')
+
+
+def take_pending():
+    global pending
+    with lock:
+        views, pending = pending, Counter()
+    return views
+
+
+def write_views(views):
+    """
+    Прибавляет просмотры из views к Post.views_count.
+
+    На пачку из FLUSH_BATCH_SIZE постов уходит один
+    UPDATE ... SET views_count = views_count + CASE id WHEN ... END,
+    все пачки пишутся в одной транзакции. Фрагменты лент не
+    сбрасываются, поэтому в лентах число просмотров может отставать
+    на FRAGMENT_CACHE_TIMEOUT.
+    """
+    if not views:
+        return 0
+    views = sorted(views.items())
+    with transaction.atomic():
+        for start in range(0, len(views), FLUSH_BATCH_SIZE):
+            batch = views[start:start + FLUSH_BATCH_SIZE]
+            Post.objects.filter(pk__in=[pk for pk, _ in batch]).update(
+                views_count=F('views_count') + Case(
+                    *[When(pk=pk, then=Value(count)) for pk, count in batch],
+                    default=Value(0),
+                    output_field=PositiveIntegerField(),
+                )
+            )
+    return len(views)
+
+
+def flush_views():
+    """Записывает все накопленные просмотры; возвращает число постов."""
+    return write_views(take_pending())
+
+
+@atexit.register
+def flush_on_exit():
+    # При остановке процесса база может быть уже недоступна.
+    try:
+        flush_views()
+    except DatabaseError:
+        pass
@@ -0,0 +1,94 @@
+import base64
+import os
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image, ImageOps
+
+REENCODED_FORMATS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp'}
+# Пропорции миниатюры ленты 960x339.
+PLACEHOLDER_SIZE = (32, 11)
+PLACEHOLDER_QUALITY = 30
+
+
+def read_image_meta(file):
+    """
+    Читает размеры и формат картинки только из её заголовка.
+
+    Image.open не декодирует пиксели, пока их не попросят, поэтому
+    чтение ограничивается первыми килобайтами файла.
+    """
+    file.seek(0)
+    with Image.open(file) as image:
+        return image.width, image.height, image.format
+
+
+def is_too_large(width, height):
+    return width * height > settings.POST_IMAGE_MAX_PIXELS
+
+
+def normalize_image(upload):
+    """
+    Приводит загруженную картинку к виду, в котором она хранится.
+
+    Картинка поворачивается по EXIF, ужимается до POST_IMAGE_MAX_SIDE
+    по большей стороне и перекодируется с POST_IMAGE_QUALITY уже без
+    метаданных. JPEG при этом сразу декодируется уменьшенным, а результат
+    пишется во временный файл, который остаётся в памяти, только пока
+    он небольшой. Анимации и прочие форматы возвращаются как есть.
+
+    Возвращает файл, размеры и формат сохраняемой картинки.
+    """
+    upload.seek(0)
+    with Image.open(upload) as image:
+        image_format = image.format
+        if (
+            image_format not in REENCODED_FORMATS
+            or getattr(image, 'is_animated', False)
+        ):
+            return upload, image.size, image_format
+        max_side = settings.POST_IMAGE_MAX_SIDE
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        icc_profile = image.info.get('icc_profile')
+        image = ImageOps.exif_transpose(image)
+        output = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        image.save(
+            output,
+            image_format,
+            quality=settings.POST_IMAGE_QUALITY,
+            optimize=True,
+            icc_profile=icc_profile,
+            # exif_transpose оставляет в info остальной EXIF, а PNG
+            # и WebP записывают его обратно, в том числе координаты.
+            exif=b'',
+        )
+    name = os.path.splitext(upload.name)[0] + REENCODED_FORMATS[image_format]
+    normalized = UploadedFile(
+        output,
+        name=name,
+        content_type=Image.MIME[image_format],
+        size=output.tell(),
+    )
+    return normalized, image.size, image_format
+
+
+def make_placeholder(file):
+    """
+    Строит крошечную WebP-заглушку миниатюры ленты в виде data URI.
+
+    Заглушка обрезана в пропорциях миниатюры и весит пару сотен байт,
+    поэтому её можно вставлять прямо в разметку, пока грузится картинка.
+    """
+    file.seek(0)
+    with Image.open(file) as image:
+        image.draft('RGB', PLACEHOLDER_SIZE)
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        image = ImageOps.fit(image, PLACEHOLDER_SIZE, Image.BILINEAR)
+    output = BytesIO()
+    image.save(output, 'WEBP', quality=PLACEHOLDER_QUALITY)
+    encoded = base64.b64encode(output.getvalue()).decode()
+    return f'data:image/webp;base64,{encoded}'
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Заполняет начало текста для ленты у старых постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько постов обновлять за один запрос.',
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересчитать все посты, например после смены длины.',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.order_by('pk').only(
+            'pk', 'text', *Post.derived_fields
+        )
+        if not options['all']:
+            posts = posts.filter(excerpt='').exclude(text='')
+        batch, updated = [], 0
+        for post in posts.iterator(chunk_size=options['batch_size']):
+            excerpt = post.excerpt
+            post.render_text()
+            if post.excerpt == excerpt:
+                continue
+            batch.append(post)
+            if len(batch) >= options['batch_size']:
+                updated += self.flush(batch)
+        updated += self.flush(batch)
+        self.stdout.write(f'Обновлено {updated}.')
+
+    @staticmethod
+    def flush(batch):
+        Post.objects.bulk_update(batch, Post.derived_fields)
+        count = len(batch)
+        batch.clear()
+        return count
@@ -0,0 +1,56 @@
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from posts.images import make_placeholder, read_image_meta
+from posts.models import Post
+
+META_FIELDS = (
+    'image_width', 'image_height', 'image_format', 'image_size',
+    'image_placeholder',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет размеры, формат, вес и заглушки картинок '
+        'у старых постов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько постов обновлять за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').filter(
+            Q(image_width__isnull=True) | Q(image_placeholder=''),
+            image__isnull=False,
+        ).only('pk', 'image')
+        batch, updated, failed = [], 0, 0
+        for post in posts.iterator(chunk_size=options['batch_size']):
+            try:
+                with post.image.storage.open(post.image.name) as image:
+                    width, height, image_format = read_image_meta(image)
+                    placeholder = make_placeholder(image)
+                size = post.image.storage.size(post.image.name)
+            except (OSError, ValueError, SuspiciousFileOperation) as error:
+                failed += 1
+                self.stderr.write(f'{post.image.name}: {error}')
+                continue
+            post.image_width, post.image_height = width, height
+            post.image_format, post.image_size = image_format or '', size
+            post.image_placeholder = placeholder
+            batch.append(post)
+            if len(batch) >= options['batch_size']:
+                updated += self.flush(batch)
+        updated += self.flush(batch)
+        self.stdout.write(f'Обновлено {updated}, ошибок {failed}.')
+
+    @staticmethod
+    def flush(batch):
+        Post.objects.bulk_update(batch, META_FIELDS)
+        count = len(batch)
+        batch.clear()
+        return count
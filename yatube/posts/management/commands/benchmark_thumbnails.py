@@ -0,0 +1,151 @@
+import os
+import resource
+import tempfile
+import time
+
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+from PIL import Image
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.parsers import parse_geometry
+
+from posts.thumbnails import thumbnail_pool
+from posts.utils import THUMBNAIL_GEOMETRY, THUMBNAIL_OPTIONS
+
+ENGINES = (
+    'sorl.thumbnail.engines.pil_engine.Engine',
+    'posts.thumbnails.DraftEngine',
+)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+
+def make_corpus(directory, count, size):
+    """Создаёт шумные JPEG размером с фотографии с телефона."""
+    for number in range(count):
+        small = (size[0] // 4, size[1] // 4)
+        channels = [Image.effect_noise(small, 32 + number) for _ in range(3)]
+        image = Image.merge('RGB', channels).resize(size, Image.BICUBIC)
+        image.save(os.path.join(directory, f'{number}.jpg'), quality=90)
+
+
+def find_images(directory):
+    return sorted(
+        os.path.relpath(os.path.join(root, filename), directory)
+        for root, _, filenames in os.walk(directory)
+        for filename in filenames
+        if filename.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def reset_peak_memory():
+    """
+    Сбрасывает пиковый RSS процесса.
+
+    Иначе процесс пула наследует пик родителя, который только что
+    создавал корпус. Работает только в Linux.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        pass
+
+
+def peak_memory():
+    """Пиковый RSS процесса в килобайтах."""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def benchmark_engine(engine_path, directory, names):
+    """
+    Режет миниатюры ленты для всего корпуса одним движком.
+
+    Возвращает затраченное время и пиковый RSS процесса в килобайтах
+    до и после прогона, поэтому каждый движок запускается в отдельном
+    процессе.
+    """
+    engine = import_string(engine_path)()
+    storage = FileSystemStorage(location=directory)
+    options = dict(ThumbnailBackend.default_options, **THUMBNAIL_OPTIONS)
+    reset_peak_memory()
+    baseline = peak_memory()
+    started = time.perf_counter()
+    for name in names:
+        image = engine.get_image(ImageFile(name, storage=storage))
+        try:
+            geometry = parse_geometry(
+                THUMBNAIL_GEOMETRY, engine.get_image_ratio(image, options)
+            )
+            thumbnail = engine.create(image, geometry, options)
+            engine._get_raw_data(
+                thumbnail, options['format'], options['quality'],
+                engine.get_image_info(image),
+            )
+        finally:
+            engine.cleanup(image)
+    elapsed = time.perf_counter() - started
+    peak = peak_memory()
+    return elapsed, baseline, peak
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает стандартный движок sorl-thumbnail с DraftEngine '
+        'по времени и пиковой памяти на миниатюрах ленты.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--corpus',
+            help=(
+                'Каталог с настоящими загрузками, например MEDIA_ROOT/posts. '
+                'Без него создаётся синтетический корпус.'
+            ),
+        )
+        parser.add_argument(
+            '--count', type=int, default=8,
+            help='Сколько картинок создать для синтетического корпуса.',
+        )
+        parser.add_argument(
+            '--size', default='4032x3024',
+            help='Размер картинок синтетического корпуса.',
+        )
+
+    def handle(self, *args, **options):
+        if options['corpus']:
+            self.run(options['corpus'])
+            return
+        try:
+            size = tuple(map(int, options['size'].split('x')))
+        except ValueError:
+            raise CommandError('Размер задаётся как ШИРИНАxВЫСОТА.')
+        with tempfile.TemporaryDirectory() as directory:
+            make_corpus(directory, options['count'], size)
+            self.run(directory)
+
+    def run(self, directory):
+        names = find_images(directory)
+        if not names:
+            raise CommandError(f'В {directory} нет картинок.')
+        results = {}
+        for engine_path in ENGINES:
+            with thumbnail_pool(1) as pool:
+                results[engine_path] = pool.submit(
+                    benchmark_engine, engine_path, directory, names
+                ).result()
+        baseline_time = results[ENGINES[0]][0]
+        for engine_path, (elapsed, baseline, peak) in results.items():
+            self.stdout.write(
+                f'{engine_path}: {elapsed / len(names) * 1000:.0f} мс '
+                f'на картинку (x{baseline_time / elapsed:.1f}), '
+                f'пик памяти +{(peak - baseline) // 1024} МБ.'
+            )
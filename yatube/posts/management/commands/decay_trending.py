@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from posts.models import GroupScore, PostScore, TrendingDecay
+
+
+class Command(BaseCommand):
+    help = (
+        'Уменьшает рейтинги популярного за время, прошедшее с прошлого '
+        'запуска, и удаляет угасшие. Запускается по расписанию.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=10,
+            help=(
+                'Сколько минут считать прошедшими при первом запуске, '
+                'пока время прошлого запуска неизвестно.'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        removed = {}
+        with transaction.atomic():
+            factor = 0.5 ** (
+                self.elapsed_hours(options['interval'])
+                / settings.TRENDING_HALF_LIFE
+            )
+            for model in (PostScore, GroupScore):
+                model.objects.update(score=F('score') * factor)
+                removed[model], _ = model.objects.filter(
+                    score__lt=settings.TRENDING_MIN_SCORE
+                ).delete()
+        for model, count in removed.items():
+            self.stdout.write(f'{model.__name__}: удалено угасших {count}.')
+
+    @staticmethod
+    def elapsed_hours(first_interval):
+        """Часы с прошлого запуска; время запуска сразу обновляется."""
+        now = timezone.now()
+        state = TrendingDecay.objects.select_for_update().first()
+        if state is None:
+            TrendingDecay.objects.create(decayed_at=now)
+            return first_interval / 60
+        elapsed = now - state.decayed_at
+        state.decayed_at = now
+        state.save(update_fields=['decayed_at'])
+        return max(elapsed.total_seconds(), 0) / 3600
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.tags import index_post
+
+
+class Command(BaseCommand):
+    help = 'Разбирает #теги и @упоминания в уже опубликованных постах.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько постов читать за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.order_by('pk').only('pk', 'text')
+        indexed = 0
+        for post in posts.iterator(chunk_size=options['batch_size']):
+            index_post(post)
+            indexed += 1
+        self.stdout.write(f'Обработано постов: {indexed}.')
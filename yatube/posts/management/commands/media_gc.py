@@ -0,0 +1,165 @@
+import os
+import shutil
+import time
+
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+from posts.models import Post
+from posts.storage import REFS_SUFFIX, post_image_storage
+
+MEGABYTE = 1024 * 1024
+
+
+def scan_files(directory):
+    """Обходит дерево каталогов, не собирая его целиком в память."""
+    try:
+        entries = os.scandir(directory)
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from scan_files(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry
+
+
+def touched_since(path, cutoff):
+    """Менялся ли файл или его счётчик ссылок после cutoff."""
+    for candidate in (path, path + REFS_SUFFIX):
+        try:
+            if os.stat(candidate).st_mtime > cutoff:
+                return True
+        except FileNotFoundError:
+            continue
+    return False
+
+
+def referenced_images():
+    return set(
+        Post.objects.exclude(image='').values_list(
+            'image', flat=True
+        ).iterator()
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки, на которые не ссылается ни один пост, '
+        'их миниатюры и записи sorl-thumbnail, а также держит кэш '
+        'миниатюр в заданном объёме, вытесняя давно не читанные.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено.',
+        )
+        parser.add_argument(
+            '--quarantine',
+            help='Переносить картинки-сироты в этот каталог, а не удалять.',
+        )
+        parser.add_argument(
+            '--min-age', type=float, default=24,
+            help=(
+                'Не трогать файлы моложе стольких часов: их могут '
+                'сохранять прямо сейчас.'
+            ),
+        )
+        parser.add_argument(
+            '--thumbnail-budget', type=float,
+            help='Предельный объём кэша миниатюр в мегабайтах.',
+        )
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.verbosity = options['verbosity']
+        referenced = referenced_images()
+        cutoff = time.time() - options['min_age'] * 60 * 60
+        count, size = self.collect_originals(
+            referenced, cutoff, options['quarantine']
+        )
+        self.report(
+            f'Картинок-сирот: {count}, {size / MEGABYTE:.1f} МБ.'
+        )
+        self.report(
+            f'Записей миниатюр удалённых картинок: '
+            f'{self.prune_thumbnails(referenced)}.'
+        )
+        if options['thumbnail_budget'] is not None:
+            count, size = self.evict_thumbnails(
+                options['thumbnail_budget'] * MEGABYTE
+            )
+            self.report(
+                f'Вытеснено миниатюр: {count}, {size / MEGABYTE:.1f} МБ.'
+            )
+        if not self.dry_run:
+            default.kvstore.cleanup()
+
+    def report(self, message):
+        prefix = 'Пробный запуск. ' if self.dry_run else ''
+        self.stdout.write(prefix + message)
+
+    def collect_originals(self, referenced, cutoff, quarantine):
+        upload_to = Post._meta.get_field('image').upload_to
+        root = post_image_storage.location
+        count = size = 0
+        for entry in scan_files(os.path.join(root, upload_to)):
+            name = os.path.relpath(entry.path, root).replace(os.sep, '/')
+            source = name
+            if name.endswith(REFS_SUFFIX):
+                source = name[:-len(REFS_SUFFIX)]
+            if source in referenced or touched_since(
+                os.path.join(root, source), cutoff
+            ):
+                continue
+            stat = entry.stat(follow_symlinks=False)
+            count += 1
+            size += stat.st_size
+            if self.verbosity > 1:
+                self.stdout.write(name)
+            if not self.dry_run:
+                self.remove(entry.path, name, quarantine)
+        return count, size
+
+    def remove(self, path, name, quarantine):
+        if quarantine is None:
+            os.remove(path)
+            return
+        target = os.path.join(quarantine, name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(path, target)
+
+    def prune_thumbnails(self, referenced):
+        """Удаляет миниатюры и записи KV для картинок без постов."""
+        kvstore = default.kvstore
+        pruned = 0
+        for key in kvstore._find_keys(identity='thumbnails'):
+            source = kvstore._get(key)
+            if source is None or source.name in referenced:
+                continue
+            pruned += 1
+            if not self.dry_run:
+                kvstore.delete(source)
+        return pruned
+
+    def evict_thumbnails(self, budget):
+        """Удаляет самые давно читанные миниатюры сверх бюджета."""
+        directory = default.storage.path(thumbnail_settings.THUMBNAIL_PREFIX)
+        thumbnails = []
+        for entry in scan_files(directory):
+            stat = entry.stat(follow_symlinks=False)
+            last_used = max(stat.st_atime, stat.st_mtime)
+            thumbnails.append((last_used, stat.st_size, entry.path))
+        excess = sum(size for _, size, _ in thumbnails) - budget
+        count = evicted = 0
+        for _, size, path in sorted(thumbnails):
+            if evicted >= excess:
+                break
+            count += 1
+            evicted += size
+            if not self.dry_run:
+                os.remove(path)
+        return count, evicted
@@ -0,0 +1,58 @@
+import os
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Follow, Suggestion
+from posts.recommendations import (
+    FollowGraph, init_worker, recommend_chunk, recommendation_pool,
+)
+
+
+def chunks(size, chunk_size):
+    for start in range(0, size, chunk_size):
+        yield range(start, min(start + chunk_size, size))
+
+
+class Command(BaseCommand):
+    help = (
+        'Считает по графу подписок, кого почитать каждому пользователю, '
+        'и перезаписывает таблицу подсказок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count(),
+            help='Сколько процессов считают подсказки; 0 - в этом процессе.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Сколько пользователей в одной задаче пула.',
+        )
+
+    def handle(self, *args, **options):
+        graph = FollowGraph(
+            Follow.objects.values_list('user_id', 'author_id').iterator()
+        )
+        tasks = chunks(len(graph), options['chunk_size'])
+        if options['processes']:
+            with recommendation_pool(graph, options['processes']) as pool:
+                results = list(pool.map(recommend_chunk, tasks))
+        else:
+            init_worker(graph)
+            results = [recommend_chunk(task) for task in tasks]
+        suggestions = [
+            Suggestion(
+                user_id=user_id, author_id=author_id, rank=rank, score=score
+            )
+            for result in results
+            for user_id, candidates in result
+            for rank, (author_id, score) in enumerate(candidates, 1)
+        ]
+        with transaction.atomic():
+            Suggestion.objects.all().delete()
+            Suggestion.objects.bulk_create(suggestions, batch_size=500)
+        self.stdout.write(
+            f'Пользователей в графе: {len(graph)}, '
+            f'подсказок: {len(suggestions)}.'
+        )
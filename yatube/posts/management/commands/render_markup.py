@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from posts.markup import MARKUP_VERSION
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново строит HTML постов и комментариев, собранный прошлой '
+        'версией разметки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько записей обновлять за один запрос.',
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Перестроить все записи независимо от версии.',
+        )
+
+    def handle(self, *args, **options):
+        for model in (Post, Comment):
+            updated = self.render(model, options)
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: обновлено {updated}.'
+            )
+
+    @staticmethod
+    def render(model, options):
+        objects = model.objects.order_by('pk').only(
+            'pk', 'text', *model.derived_fields
+        )
+        if not options['all']:
+            objects = objects.exclude(markup_version=MARKUP_VERSION)
+        batch, updated = [], 0
+        for obj in objects.iterator(chunk_size=options['batch_size']):
+            obj.render_text()
+            batch.append(obj)
+            if len(batch) >= options['batch_size']:
+                model.objects.bulk_update(batch, model.derived_fields)
+                updated += len(batch)
+                batch.clear()
+        model.objects.bulk_update(batch, model.derived_fields)
+        return updated + len(batch)
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, DateTimeField, OuterRef, Subquery
+
+from posts.models import Comment, Post
+
+COMMENT_FIELDS = ('comments_count', 'last_comment_at')
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает число комментариев и дату последнего комментария '
+        'у постов, где они разошлись с таблицей комментариев.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько постов обновлять за один запрос.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, сколько постов разошлось.',
+        )
+
+    def handle(self, *args, **options):
+        comments = Comment.objects.filter(
+            post=OuterRef('pk')
+        ).order_by().values('post')
+        posts = Post.objects.annotate(
+            actual_count=Subquery(
+                comments.annotate(count=Count('pk')).values('count')
+            ),
+            actual_last=Subquery(
+                comments.order_by('-pub_date').values('pub_date')[:1],
+                output_field=DateTimeField(),
+            ),
+        ).only(*COMMENT_FIELDS)
+        batch, repaired = [], 0
+        for post in posts.iterator(chunk_size=options['batch_size']):
+            actual_count = post.actual_count or 0
+            if (post.comments_count, post.last_comment_at) == (
+                actual_count, post.actual_last
+            ):
+                continue
+            if options['verbosity'] > 1:
+                self.stdout.write(
+                    f'{post.pk}: {post.comments_count} -> {actual_count}'
+                )
+            post.comments_count = actual_count
+            post.last_comment_at = post.actual_last
+            batch.append(post)
+            if len(batch) >= options['batch_size']:
+                repaired += self.flush(batch, options['dry_run'])
+        repaired += self.flush(batch, options['dry_run'])
+        prefix = 'Пробный запуск. ' if options['dry_run'] else ''
+        self.stdout.write(f'{prefix}Исправлено постов: {repaired}.')
+
+    @staticmethod
+    def flush(batch, dry_run):
+        if not dry_run:
+            Post.objects.bulk_update(batch, COMMENT_FIELDS)
+        count = len(batch)
+        batch.clear()
+        return count
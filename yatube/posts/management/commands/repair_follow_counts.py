@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+
+from posts.models import Follow, FollowStats, User
+
+STATS_FIELDS = ('followers_count', 'following_count')
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает число подписчиков и подписок у пользователей, '
+        'где оно разошлось с таблицей подписок, например после '
+        'bulk_create или удаления подписок запросом.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько пользователей обновлять за один запрос.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, сколько пользователей разошлось.',
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.annotate(
+            actual_followers=self.count_follows('author'),
+            actual_following=self.count_follows('user'),
+        ).order_by('pk').values(
+            'pk', 'actual_followers', 'actual_following',
+            'follow_stats__followers_count', 'follow_stats__following_count',
+        )
+        created, updated = [], []
+        for row in users.iterator(chunk_size=options['batch_size']):
+            actual = (
+                row['actual_followers'] or 0, row['actual_following'] or 0
+            )
+            stored = (
+                row['follow_stats__followers_count'],
+                row['follow_stats__following_count'],
+            )
+            missing = stored == (None, None)
+            if stored == actual or missing and actual == (0, 0):
+                continue
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{row["pk"]}: {stored} -> {actual}')
+            stats = FollowStats(
+                user_id=row['pk'],
+                followers_count=actual[0],
+                following_count=actual[1],
+            )
+            (created if missing else updated).append(stats)
+        repaired = len(created) + len(updated)
+        if not options['dry_run']:
+            FollowStats.objects.bulk_create(
+                created, batch_size=options['batch_size']
+            )
+            FollowStats.objects.bulk_update(
+                updated, STATS_FIELDS, batch_size=options['batch_size']
+            )
+        prefix = 'Пробный запуск. ' if options['dry_run'] else ''
+        self.stdout.write(f'{prefix}Исправлено пользователей: {repaired}.')
+
+    @staticmethod
+    def count_follows(field):
+        return Subquery(
+            Follow.objects.filter(**{field: OuterRef('pk')}).order_by(
+            ).values(field).annotate(count=Count('pk')).values('count')
+        )
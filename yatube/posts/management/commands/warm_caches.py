@@ -0,0 +1,158 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+from contextlib import ExitStack
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Count
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from posts.counts import EstimatedCount
+from posts.models import Group, Post, User
+from posts.thumbnails import render_thumbnail, thumbnail_pool
+from posts.utils import MAX_POSTS, pages
+
+
+def warm_page(url):
+    """Рендерит страницу от имени гостя, заполняя кэш страниц и фрагментов."""
+    request = RequestFactory().get(url)
+    request.user = AnonymousUser()
+    match = resolve(request.path)
+    response = match.func(request, *match.args, **match.kwargs)
+    if hasattr(response, 'render') and callable(response.render):
+        response.render()
+
+
+def run_task(deadline, func, arg):
+    if time.monotonic() > deadline:
+        return False
+    try:
+        func(arg)
+    finally:
+        connections.close_all()
+    return True
+
+
+def submit(executor, deadline, tasks):
+    return {
+        executor.submit(run_task, deadline, func, arg): arg
+        for func, arg in tasks
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогревает кэш первых страниц главной, популярных групп '
+        'и самых читаемых авторов вместе с миниатюрами. '
+        'Имеет смысл только с общим для процессов бэкендом кэша.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, default=5,
+            help='Сколько первых страниц главной прогреть.',
+        )
+        parser.add_argument(
+            '--groups', type=int, default=10,
+            help='Сколько самых активных групп прогреть.',
+        )
+        parser.add_argument(
+            '--authors', type=int, default=10,
+            help='Сколько авторов с наибольшим числом подписчиков прогреть.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Размер пула потоков для страниц.',
+        )
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count(),
+            help=(
+                'Размер пула процессов для миниатюр; '
+                '0 - резать миниатюры в пуле потоков.'
+            ),
+        )
+        parser.add_argument(
+            '--budget', type=float, default=60,
+            help='Ограничение по времени в секундах.',
+        )
+
+    def handle(self, *args, **options):
+        deadline = time.monotonic() + options['budget']
+        urls, images = self.collect(options)
+        page_tasks = [(warm_page, url) for url in urls]
+        thumbnail_tasks = [(render_thumbnail, name) for name in sorted(images)]
+        if not options['processes']:
+            page_tasks, thumbnail_tasks = page_tasks + thumbnail_tasks, []
+        total = len(page_tasks) + len(thumbnail_tasks)
+        done = failed = 0
+        with ExitStack() as stack:
+            threads = stack.enter_context(
+                ThreadPoolExecutor(max_workers=options['workers'])
+            )
+            futures = {}
+            if thumbnail_tasks:
+                processes = stack.enter_context(
+                    thumbnail_pool(options['processes'])
+                )
+                futures.update(submit(processes, deadline, thumbnail_tasks))
+            futures.update(submit(threads, deadline, page_tasks))
+            try:
+                for future in as_completed(
+                    futures, timeout=max(deadline - time.monotonic(), 0)
+                ):
+                    if future.exception() is not None:
+                        failed += 1
+                        self.stderr.write(
+                            f'{futures[future]}: {future.exception()}'
+                        )
+                    elif future.result():
+                        done += 1
+            except TimeoutError:
+                for future in futures:
+                    future.cancel()
+        self.stdout.write(
+            f'Прогрето {done} из {total}, ошибок {failed}, '
+            f'пропущено по времени {total - done - failed}.'
+        )
+
+    def collect(self, options):
+        index_url = reverse('posts:index')
+        posts = Post.objects.all()
+        num_pages = pages(posts, EstimatedCount(posts)).num_pages
+        urls = [
+            f'{index_url}?page={number}'
+            for number in range(1, min(options['pages'], num_pages) + 1)
+        ]
+        images = set(Post.objects.values_list('image', flat=True)[
+            :options['pages'] * MAX_POSTS
+        ])
+        slugs = Group.objects.annotate(
+            posts_count=Count('group')
+        ).filter(
+            posts_count__gt=0
+        ).order_by('-posts_count').values_list('slug', flat=True)[
+            :options['groups']
+        ]
+        for slug in slugs:
+            urls.append(reverse('posts:group_list', args=(slug,)))
+            images.update(Post.objects.filter(
+                group__slug=slug
+            ).values_list('image', flat=True)[:MAX_POSTS])
+        usernames = User.objects.annotate(
+            followers_count=Count('following')
+        ).filter(
+            followers_count__gt=0
+        ).order_by('-followers_count').values_list('username', flat=True)[
+            :options['authors']
+        ]
+        for username in usernames:
+            urls.append(reverse('posts:profile', args=(username,)))
+            images.update(Post.objects.filter(
+                author__username=username
+            ).values_list('image', flat=True)[:MAX_POSTS])
+        images.discard(None)
+        images.discard('')
+        return urls, images
@@ -0,0 +1,103 @@
+import re
+
+from django.utils.html import escape
+
+MARKUP_VERSION = 2
+SAFE_URL_RE = re.compile(r'^(https?://|mailto:|/(?![/\\]))', re.IGNORECASE)
+FENCE = '```'
+INLINE_RE = re.compile(
+    r'(?P<code>`+)(?P<code_text>.+?)(?P=code)'
+    r'|\[(?P<link_text>[^\]\n]+)\]\((?P<url>[^)\s]+)\)'
+)
+STRONG_RE = re.compile(r'\*\*(?=\S)(.+?)(?<=\S)\*\*')
+EM_RE = re.compile(
+    r'(?<![\w*])\*(?=\S)(.+?)(?<=\S)\*(?![\w*])'
+    r'|(?<!\w)_(?=\S)(.+?)(?<=\S)_(?!\w)'
+)
+
+
+def emphasis(text):
+    """Экранирует текст и размечает **жирный** и *курсив*."""
+    text = STRONG_RE.sub(r'<strong>\1</strong>', escape(text))
+    return EM_RE.sub(
+        lambda match: f'<em>{match.group(1) or match.group(2)}</em>', text
+    )
+
+
+def render_link(text, url):
+    if not SAFE_URL_RE.match(url):
+        return emphasis(text)
+    return (
+        f'<a href="{escape(url)}" rel="nofollow noopener">'
+        f'{emphasis(text)}</a>'
+    )
+
+
+def render_inline(text):
+    """
+    Строка со ссылками, кодом и выделением.
+
+    Всё, что не распознано как разметка, экранируется, поэтому
+    пользовательский HTML никогда не попадает в вывод как есть.
+    Ссылки допускаются только на http(s), mailto и пути сайта.
+    """
+    parts, position = [], 0
+    for match in INLINE_RE.finditer(text):
+        parts.append(emphasis(text[position:match.start()]))
+        if match.group('code'):
+            parts.append(f'<code>{escape(match.group("code_text"))}</code>')
+        else:
+            parts.append(
+                render_link(match.group('link_text'), match.group('url'))
+            )
+        position = match.end()
+    parts.append(emphasis(text[position:]))
+    return ''.join(parts)
+
+
+def split_blocks(text):
+    """Делит текст на абзацы и блоки кода между ```."""
+    blocks, lines, code = [], [], None
+    for line in text.replace('\r\n', '\n').split('\n'):
+        if code is not None:
+            if line.strip() == FENCE:
+                blocks.append(('code', code))
+                code = None
+            else:
+                code.append(line)
+        elif line.strip().startswith(FENCE):
+            if lines:
+                blocks.append(('paragraph', lines))
+            lines, code = [], []
+        elif not line.strip():
+            if lines:
+                blocks.append(('paragraph', lines))
+            lines = []
+        else:
+            lines.append(line.strip())
+    if code is not None:
+        blocks.append(('code', code))
+    if lines:
+        blocks.append(('paragraph', lines))
+    return blocks
+
+
+def render_markdown(text):
+    """
+    Переводит подмножество Markdown в безопасный HTML.
+
+    Поддерживаются абзацы, переносы строк, ссылки, `код`, блоки
+    кода, **жирный** и *курсив*. При изменении вывода нужно поднять
+    MARKUP_VERSION и запустить render_markup.
+    """
+    html = []
+    for kind, lines in split_blocks(text):
+        if kind == 'code':
+            code = escape('\n'.join(lines))
+            html.append(f'<pre><code>{code}</code></pre>')
+        else:
+            html.append(
+                '<p>' + '<br>'.join(render_inline(line) for line in lines)
+                + '</p>'
+            )
+    return '\n'.join(html)
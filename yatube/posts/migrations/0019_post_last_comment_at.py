@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-19 02:08
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def date_last_comments(apps, schema_editor):
+    Comment = apps.get_model('posts', 'Comment')
+    Post = apps.get_model('posts', 'Post')
+    latest = Comment.objects.filter(
+        post=OuterRef('pk')
+    ).order_by('-pub_date').values('pub_date')[:1]
+    Post.objects.filter(pk__in=Comment.objects.values('post')).update(
+        last_comment_at=Subquery(latest)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_post_comments_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='last_comment_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='Дата последнего комментария'),
+        ),
+        migrations.RunPython(date_last_comments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,161 @@
+# Generated by Django 2.2.16 on 2026-10-19 02:15
+
+import re
+from html import unescape
+
+from django.db import migrations, models
+from django.utils.html import escape, strip_tags
+
+# Копия разметки и обрезки текста на момент миграции: код приложения
+# может измениться, а миграция должна делать то же самое. Записи
+# получают версию 1, более новые версии доводит команда render_markup.
+MARKUP_VERSION = 1
+BATCH_SIZE = 500
+ELLIPSIS = '…'
+EXCERPT_LENGTH = 300
+SAFE_URL_RE = re.compile(r'^(https?://|mailto:|/(?![/\\]))', re.IGNORECASE)
+FENCE = '```'
+INLINE_RE = re.compile(
+    r'(?P<code>`+)(?P<code_text>.+?)(?P=code)'
+    r'|\[(?P<link_text>[^\]\n]+)\]\((?P<url>[^)\s]+)\)'
+)
+STRONG_RE = re.compile(r'\*\*(?=\S)(.+?)(?<=\S)\*\*')
+EM_RE = re.compile(
+    r'(?<![\w*])\*(?=\S)(.+?)(?<=\S)\*(?![\w*])'
+    r'|(?<!\w)_(?=\S)(.+?)(?<=\S)_(?!\w)'
+)
+
+
+def emphasis(text):
+    text = STRONG_RE.sub(r'<strong>\1</strong>', escape(text))
+    return EM_RE.sub(
+        lambda match: f'<em>{match.group(1) or match.group(2)}</em>', text
+    )
+
+
+def render_link(text, url):
+    if not SAFE_URL_RE.match(url):
+        return emphasis(text)
+    return (
+        f'<a href="{escape(url)}" rel="nofollow noopener">'
+        f'{emphasis(text)}</a>'
+    )
+
+
+def render_inline(text):
+    parts, position = [], 0
+    for match in INLINE_RE.finditer(text):
+        parts.append(emphasis(text[position:match.start()]))
+        if match.group('code'):
+            parts.append(f'<code>{escape(match.group("code_text"))}</code>')
+        else:
+            parts.append(
+                render_link(match.group('link_text'), match.group('url'))
+            )
+        position = match.end()
+    parts.append(emphasis(text[position:]))
+    return ''.join(parts)
+
+
+def split_blocks(text):
+    blocks, lines, code = [], [], None
+    for line in text.replace('\r\n', '\n').split('\n'):
+        if code is not None:
+            if line.strip() == FENCE:
+                blocks.append(('code', code))
+                code = None
+            else:
+                code.append(line)
+        elif line.strip().startswith(FENCE):
+            if lines:
+                blocks.append(('paragraph', lines))
+            lines, code = [], []
+        elif not line.strip():
+            if lines:
+                blocks.append(('paragraph', lines))
+            lines = []
+        else:
+            lines.append(line.strip())
+    if code is not None:
+        blocks.append(('code', code))
+    if lines:
+        blocks.append(('paragraph', lines))
+    return blocks
+
+
+def render_markdown(text):
+    html = []
+    for kind, lines in split_blocks(text):
+        if kind == 'code':
+            code = escape('\n'.join(lines))
+            html.append(f'<pre><code>{code}</code></pre>')
+        else:
+            html.append(
+                '<p>' + '<br>'.join(render_inline(line) for line in lines)
+                + '</p>'
+            )
+    return '\n'.join(html)
+
+
+def make_excerpt(text):
+    text = ' '.join(unescape(strip_tags(text)).split())
+    if len(text) <= EXCERPT_LENGTH:
+        return text
+    head = text[:EXCERPT_LENGTH + 1]
+    if ' ' in head:
+        head = head.rsplit(' ', 1)[0]
+    else:
+        head = text[:EXCERPT_LENGTH]
+    return head.rstrip(' ,.;:-—') + ELLIPSIS
+
+
+def render_texts(apps, schema_editor):
+    for name, fields in (
+        ('Post', ('text_html', 'markup_version', 'excerpt')),
+        ('Comment', ('text_html', 'markup_version')),
+    ):
+        model = apps.get_model('posts', name)
+        batch = []
+        for obj in model.objects.order_by('pk').only('pk', 'text').iterator(
+            chunk_size=BATCH_SIZE
+        ):
+            obj.text_html = render_markdown(obj.text)
+            obj.markup_version = MARKUP_VERSION
+            if name == 'Post':
+                obj.excerpt = make_excerpt(obj.text_html)
+            batch.append(obj)
+            if len(batch) >= BATCH_SIZE:
+                model.objects.bulk_update(batch, fields)
+                batch.clear()
+        model.objects.bulk_update(batch, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_post_excerpt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='markup_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Версия разметки'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='HTML текста'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='markup_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Версия разметки'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='HTML текста'),
+        ),
+        migrations.RunPython(render_texts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 2.2.16 on 2026-10-19 02:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Min
+
+
+def remove_duplicate_follows(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    keep = Follow.objects.values('user', 'author').annotate(
+        first=Min('pk'), copies=Count('pk')
+    ).filter(copies__gt=1)
+    for pair in keep:
+        Follow.objects.filter(
+            user=pair['user'], author=pair['author']
+        ).exclude(pk=pair['first']).delete()
+
+
+def count_follows(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    FollowStats = apps.get_model('posts', 'FollowStats')
+    stats = {}
+    for field, counter in (
+        ('author', 'followers_count'), ('user', 'following_count')
+    ):
+        for row in Follow.objects.values(field).annotate(count=Count('pk')):
+            stats.setdefault(row[field], FollowStats(user_id=row[field]))
+            setattr(stats[row[field]], counter, row['count'])
+    FollowStats.objects.bulk_create(stats.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0024_suggestion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='follow_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+            ],
+        ),
+        migrations.RunPython(
+            remove_duplicate_follows, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+        migrations.RunPython(count_follows, migrations.RunPython.noop),
+    ]
@@ -3,6 +3,10 @@ from django.db import models
 
 from core.models import CreationDateModel
 
+from .markup import MARKUP_VERSION, render_markdown
+from .storage import post_image_storage
+from .utils import ELLIPSIS, make_excerpt
+
 User = get_user_model()
 
 
@@ -15,11 +19,61 @@ class Group(models.Model):
         return self.title
 
 
-class Post(CreationDateModel):
+class RenderedTextModel(models.Model):
+    """
+    Абстрактная модель с текстом в Markdown и готовым HTML.
+
+    HTML строится при сохранении, а шаблоны выводят только его.
+    Поля из derived_fields пересчитываются вместе с text и при
+    save(update_fields=['text']).
+    """
+    text_html = models.TextField(
+        'HTML текста',
+        blank=True,
+        editable=False,
+    )
+    markup_version = models.PositiveSmallIntegerField(
+        'Версия разметки',
+        default=0,
+        editable=False,
+    )
+
+    derived_fields = ('text_html', 'markup_version')
+
+    def render_text(self):
+        self.text_html = render_markdown(self.text)
+        self.markup_version = MARKUP_VERSION
+
+    def save(self, *args, **kwargs):
+        self.render_text()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {*update_fields, *self.derived_fields}
+        super().save(*args, **kwargs)
+
+    class Meta:
+        abstract = True
+
+
+class RenderedTextQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """Строит HTML: при массовой вставке save() не вызывается."""
+        objs = list(objs)
+        for obj in objs:
+            obj.render_text()
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class Post(RenderedTextModel, CreationDateModel):
     text = models.TextField(
         verbose_name='Текст поста',
         help_text='Текст нового поста',
     )
+    excerpt = models.TextField(
+        'Начало текста',
+        blank=True,
+        editable=False,
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -37,22 +91,82 @@ class Post(CreationDateModel):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=post_image_storage,
+        db_index=True,
         blank=True,
         null=True,
         help_text='Загрузите картинку',
     )
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    image_format = models.CharField(
+        'Формат картинки',
+        max_length=10,
+        blank=True,
+        editable=False,
+    )
+    image_size = models.PositiveIntegerField(
+        'Размер картинки в байтах',
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    image_placeholder = models.TextField(
+        'Заглушка картинки',
+        blank=True,
+        editable=False,
+    )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False,
+    )
+    last_comment_at = models.DateTimeField(
+        'Дата последнего комментария',
+        blank=True,
+        null=True,
+        db_index=True,
+        editable=False,
+    )
+    views_count = models.PositiveIntegerField(
+        'Число просмотров',
+        default=0,
+        editable=False,
+    )
+
+    objects = RenderedTextQuerySet.as_manager()
+
+    derived_fields = (*RenderedTextModel.derived_fields, 'excerpt')
 
     def __str__(self):
         CROPPING_LIMIT = 15
         return self.text[:CROPPING_LIMIT]
 
+    @property
+    def excerpt_is_truncated(self):
+        return self.excerpt.endswith(ELLIPSIS)
+
+    def render_text(self):
+        super().render_text()
+        self.excerpt = make_excerpt(self.text_html)
+
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
 
-class Comment(CreationDateModel):
+class Comment(RenderedTextModel, CreationDateModel):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
@@ -69,6 +183,8 @@ class Comment(CreationDateModel):
         help_text='Текст нового комментария',
     )
 
+    objects = RenderedTextQuerySet.as_manager()
+
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Комментарий'
@@ -86,3 +202,138 @@ class Follow(models.Model):
         related_name='following',
         on_delete=models.CASCADE,
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'
+            ),
+        ]
+
+
+class FollowStats(models.Model):
+    """Число подписчиков и подписок пользователя, без COUNT по Follow."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='follow_stats',
+    )
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+
+class Tag(models.Model):
+    name = models.CharField('Тег', max_length=50, unique=True)
+
+    def __str__(self):
+        return f'#{self.name}'
+
+
+class PostTag(models.Model):
+    """
+    Тег поста.
+
+    Уникальный индекс (tag, post) сразу служит для ленты тега:
+    страница - диапазон этого индекса по убыванию post_id.
+    """
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='post_tags',
+        db_index=False,
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='post_tags',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tag', 'post'], name='unique_post_tag'
+            ),
+        ]
+
+
+class Mention(models.Model):
+    """Упоминание пользователя в посте, индекс (user, post) как у тегов."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='mentions',
+        db_index=False,
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='mentions',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_mention'
+            ),
+        ]
+
+
+class PostScore(models.Model):
+    """Рейтинг поста в популярном: сумма весов событий с затуханием."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending_score',
+    )
+    score = models.FloatField('Рейтинг', default=0, db_index=True)
+
+
+class GroupScore(models.Model):
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending_score',
+    )
+    score = models.FloatField('Рейтинг', default=0, db_index=True)
+
+
+class TrendingDecay(models.Model):
+    """
+    Время последнего уменьшения рейтингов популярного.
+
+    Одна строка: decay_trending считает множитель по тому, сколько
+    прошло на самом деле, а не по расписанию запуска.
+    """
+    decayed_at = models.DateTimeField('Последнее уменьшение')
+
+
+class Suggestion(models.Model):
+    """
+    Кого почитать: заранее посчитанные кандидаты в подписки.
+
+    Таблицу целиком перезаписывает команда recommend_follows,
+    а страница читает подсказки по индексу (user, rank).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='suggestions',
+        db_index=False,
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='suggested_to',
+    )
+    rank = models.PositiveSmallIntegerField('Место')
+    score = models.FloatField('Оценка')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'rank'], name='unique_suggestion_rank'
+            ),
+        ]
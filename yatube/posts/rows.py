@@ -0,0 +1,167 @@
+from django.db.models.fields.files import FieldFile
+from django.utils.functional import cached_property
+
+from .models import Group, Post, User
+
+FEED_FIELDS = (
+    'pk', 'excerpt', 'pub_date', 'image', 'image_placeholder',
+    'comments_count', 'last_comment_at', 'views_count',
+    'author_id', 'author__username', 'author__first_name',
+    'author__last_name',
+    'group_id', 'group__slug', 'group__title',
+)
+IMAGE_FIELD = Post._meta.get_field('image')
+
+
+class Row:
+    """Строка выборки, равная объекту своей модели с тем же pk."""
+
+    __slots__ = ()
+    model = None
+
+    def __init__(self, **values):
+        for name, value in values.items():
+            setattr(self, name, value)
+
+    def __eq__(self, other):
+        if isinstance(other, (type(self), self.model)):
+            return self.pk == other.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.pk)
+
+
+class AuthorRow(Row):
+    __slots__ = ('pk', 'username', 'first_name', 'last_name')
+    model = User
+
+    def __str__(self):
+        return self.username
+
+    def get_username(self):
+        return self.username
+
+    def get_full_name(self):
+        return f'{self.first_name} {self.last_name}'.strip()
+
+
+class GroupRow(Row):
+    __slots__ = ('pk', 'slug', 'title')
+    model = Group
+
+    def __str__(self):
+        return self.title
+
+
+class PostRow(Row):
+    """
+    Пост в ленте: только то, что показывает карточка.
+
+    В шаблонах ведёт себя как Post: у него есть author и group
+    с теми же атрибутами, а image - FieldFile, который понимает
+    тег thumbnail. Полного текста нет, карточка выводит excerpt.
+    """
+
+    __slots__ = (
+        'pk', 'excerpt', 'pub_date', 'image', 'image_placeholder',
+        'comments_count', 'last_comment_at', 'views_count', 'author',
+        'group',
+    )
+    model = Post
+    excerpt_is_truncated = Post.excerpt_is_truncated
+
+    @property
+    def id(self):
+        return self.pk
+
+    @classmethod
+    def from_values(cls, values):
+        group = None
+        if values['group_id'] is not None:
+            group = GroupRow(
+                pk=values['group_id'],
+                slug=values['group__slug'],
+                title=values['group__title'],
+            )
+        return cls(
+            pk=values['pk'],
+            excerpt=values['excerpt'],
+            pub_date=values['pub_date'],
+            image=FieldFile(None, IMAGE_FIELD, values['image']),
+            image_placeholder=values['image_placeholder'],
+            comments_count=values['comments_count'],
+            last_comment_at=values['last_comment_at'],
+            views_count=values['views_count'],
+            author=AuthorRow(
+                pk=values['author_id'],
+                username=values['author__username'],
+                first_name=values['author__first_name'],
+                last_name=values['author__last_name'],
+            ),
+            group=group,
+        )
+
+
+class LazyRows:
+    """
+    Срез ленты, который читается из базы при первом обращении.
+
+    Paginator кладёт его в Page, поэтому, если страница выводится
+    из закэшированного фрагмента шаблона, запроса к ленте нет.
+    """
+
+    def __init__(self, values):
+        self.values = values
+
+    @cached_property
+    def rows(self):
+        return [PostRow.from_values(values) for values in self.values]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        return self.rows[index]
+
+
+class FeedRows:
+    """
+    Лента для Paginator: срезы отдают ленивые LazyRows из PostRow.
+
+    Запрос выбирает через values() только колонки из FEED_FIELDS,
+    так что на странице не создаются объекты Post, User и Group
+    и не читаются остальные колонки пользователя.
+    """
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    @property
+    def ordered(self):
+        return self.queryset.ordered
+
+    def count(self):
+        return self.queryset.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        return LazyRows(self.queryset.values(*FEED_FIELDS)[index])
+
+    def in_bulk(self, ids):
+        return {
+            values['pk']: PostRow.from_values(values)
+            for values in self.queryset.filter(
+                pk__in=ids
+            ).values(*FEED_FIELDS)
+        }
+
+
+def posts_by_ids(ids):
+    """Строки постов в порядке ids; удалённые посты пропускаются."""
+    rows = FeedRows(Post.objects.all()).in_bulk(ids)
+    return [rows[pk] for pk in ids if pk in rows]
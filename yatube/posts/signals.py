@@ -0,0 +1,168 @@
+from threading import local
+
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.signals import (
+    post_delete, post_init, post_save, pre_delete,
+)
+from django.dispatch import receiver
+
+from core.cache import bump_content_version, forget_missing
+
+from .cache import invalidate_follow_feeds, invalidate_followers_feeds
+from .counts import (
+    ALL_SCOPE, adjust_count, author_scope, forget_counts, group_scope,
+)
+from .follows import adjust_stats, forget_following
+from .models import Comment, Follow, Group, Post, User
+from .storage import post_image_storage
+
+deleting = local()
+
+
+def posts_being_deleted():
+    return deleting.__dict__.setdefault('post_ids', set())
+
+
+@receiver((post_save, post_delete), sender=Post)
+@receiver((post_save, post_delete), sender=Comment)
+@receiver((post_save, post_delete), sender=Group)
+def invalidate_shared_fragments(sender, **kwargs):
+    """Сбрасывает общие фрагменты лент при изменении контента."""
+    bump_content_version()
+
+
+@receiver(post_save, sender=Post)
+def invalidate_feeds_on_publish(sender, instance, created, **kwargs):
+    if created:
+        invalidate_followers_feeds(instance.author_id)
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_feeds_on_delete(sender, instance, **kwargs):
+    invalidate_followers_feeds(instance.author_id)
+
+
+@receiver((post_save, post_delete), sender=Follow)
+def invalidate_feed_on_follow(sender, instance, **kwargs):
+    invalidate_follow_feeds((instance.user_id,))
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    if created:
+        adjust_stats(instance.author_id, 'followers_count', 1)
+        adjust_stats(instance.user_id, 'following_count', 1)
+        forget_following(instance.user_id)
+
+
+@receiver(post_delete, sender=Follow)
+def count_unfollow(sender, instance, **kwargs):
+    adjust_stats(instance.author_id, 'followers_count', -1)
+    adjust_stats(instance.user_id, 'following_count', -1)
+    forget_following(instance.user_id)
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    instance._stored_group_id = instance.__dict__.get('group_id')
+
+
+@receiver(post_save, sender=Post)
+def update_counts_on_save(sender, instance, created, **kwargs):
+    """Поправляет счётчики лент, в которые попал или из которых ушёл пост."""
+    old_group_id = instance._stored_group_id
+    if created:
+        adjust_count(ALL_SCOPE, 1)
+        forget_counts(
+            author_scope(instance.author_id),
+            group_scope(instance.group_id),
+        )
+    elif old_group_id != instance.group_id:
+        forget_counts(
+            group_scope(old_group_id), group_scope(instance.group_id)
+        )
+    instance._stored_group_id = instance.group_id
+
+
+@receiver(post_delete, sender=Post)
+def update_counts_on_delete(sender, instance, **kwargs):
+    adjust_count(ALL_SCOPE, -1)
+    forget_counts(
+        author_scope(instance.author_id), group_scope(instance.group_id)
+    )
+
+
+@receiver(post_save, sender=Comment)
+def count_added_comment(sender, instance, created, **kwargs):
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(
+            comments_count=F('comments_count') + 1,
+            last_comment_at=instance.pub_date,
+        )
+
+
+@receiver(pre_delete, sender=Post)
+def remember_deleted_post(sender, instance, **kwargs):
+    """Комментарии удаляемого поста не пересчитывают его счётчик."""
+    posts_being_deleted().add(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def forget_deleted_post(sender, instance, **kwargs):
+    posts_being_deleted().discard(instance.pk)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    """Уменьшает счётчик и берёт дату у самого нового из оставшихся."""
+    if instance.post_id in posts_being_deleted():
+        return
+    latest = Comment.objects.filter(
+        post=OuterRef('pk')
+    ).order_by('-pub_date').values('pub_date')[:1]
+    Post.objects.filter(
+        pk=instance.post_id, comments_count__gt=0
+    ).update(
+        comments_count=F('comments_count') - 1,
+        last_comment_at=Subquery(latest),
+    )
+
+
+@receiver(post_save, sender=Post)
+def forget_missing_post(sender, instance, **kwargs):
+    forget_missing(instance, 'pk')
+
+
+@receiver(post_save, sender=Group)
+def forget_missing_group(sender, instance, **kwargs):
+    forget_missing(instance, 'slug')
+
+
+@receiver(post_save, sender=User)
+def forget_missing_user(sender, instance, **kwargs):
+    forget_missing(instance, 'username')
+
+
+def stored_image_name(post):
+    image = post.__dict__.get('image')
+    return getattr(image, 'name', image)
+
+
+@receiver(post_init, sender=Post)
+def remember_image(sender, instance, **kwargs):
+    instance._stored_image_name = stored_image_name(instance)
+
+
+@receiver(post_save, sender=Post)
+def release_replaced_image(sender, instance, created, **kwargs):
+    """Снимает ссылку со старой картинки, если её заменили."""
+    old_name = instance._stored_image_name
+    new_name = stored_image_name(instance)
+    if not created and old_name and old_name != new_name:
+        post_image_storage.release(old_name)
+    instance._stored_image_name = new_name
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    post_image_storage.release(stored_image_name(instance))
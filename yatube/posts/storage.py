@@ -0,0 +1,148 @@
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import locks
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+from .images import read_image_meta
+
+REFS_SUFFIX = '.refs'
+SHARD_DEPTH = 2
+SHARD_WIDTH = 2
+
+
+def content_name(directory, digest, extension):
+    """Строит шардированное имя файла по хэшу содержимого."""
+    shards = [
+        digest[level * SHARD_WIDTH:(level + 1) * SHARD_WIDTH]
+        for level in range(SHARD_DEPTH)
+    ]
+    return '/'.join(
+        [directory, *shards, digest + extension.lower()]
+    ).lstrip('/')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище, в котором имя файла определяется хэшем содержимого.
+
+    Файлы раскладываются по вложенным каталогам из первых символов
+    хэша, чтобы ни в одном каталоге не копились миллионы файлов.
+    Одинаковые загрузки хранятся одним файлом, а число ссылок на него
+    ведётся в соседнем файле .refs: delete() уменьшает счётчик и удаляет
+    содержимое только вместе с последней ссылкой.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1]
+        full_directory = self.path(directory)
+        os.makedirs(full_directory, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(
+            dir=full_directory, prefix='.upload-'
+        )
+        try:
+            digest = self._stream_to_disk(content, descriptor)
+            name = content_name(directory, digest, extension)
+            full_path = self.path(name)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with self._locked_refs(name) as refs:
+                if not os.path.exists(full_path):
+                    os.chmod(temp_path, self.file_permissions_mode or 0o644)
+                    os.replace(temp_path, full_path)
+                self._write_refs(refs, self._read_refs(refs) + 1)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return name
+
+    def _stream_to_disk(self, content, descriptor):
+        hasher = hashlib.sha256()
+        with os.fdopen(descriptor, 'wb') as temp_file:
+            for chunk in content.chunks():
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                hasher.update(chunk)
+                temp_file.write(chunk)
+        return hasher.hexdigest()
+
+    def image_size(self, name):
+        """
+        Размеры картинки для sorl-thumbnail.
+
+        Берутся из сохранённых полей поста, а если их нет, из заголовка
+        файла, без чтения и декодирования всего оригинала.
+        """
+        size = apps.get_model('posts', 'Post').objects.filter(
+            image=name, image_width__isnull=False, image_height__isnull=False
+        ).values_list('image_width', 'image_height').first()
+        if size is None:
+            with self.open(name) as image:
+                width, height, _ = read_image_meta(image)
+            size = (width, height)
+        return size
+
+    def refs_path(self, name):
+        return self.path(name) + REFS_SUFFIX
+
+    def is_refcounted(self, name):
+        try:
+            return os.path.exists(self.refs_path(name))
+        except SuspiciousFileOperation:
+            return False
+
+    def refcount(self, name):
+        if not self.is_refcounted(name):
+            return 0
+        with self._locked_refs(name) as refs:
+            return self._read_refs(refs)
+
+    def release(self, name):
+        """Снимает одну ссылку на файл и удаляет его вместе с последней."""
+        if not name or not self.is_refcounted(name):
+            return
+        with self._locked_refs(name) as refs:
+            count = max(self._read_refs(refs) - 1, 0)
+            self._write_refs(refs, count)
+            if count == 0:
+                super().delete(name)
+
+    def delete(self, name):
+        if self.is_refcounted(name):
+            self.release(name)
+        else:
+            super().delete(name)
+
+    @contextmanager
+    def _locked_refs(self, name):
+        descriptor = os.open(self.refs_path(name), os.O_RDWR | os.O_CREAT)
+        with os.fdopen(descriptor, 'r+') as refs:
+            locks.lock(refs, locks.LOCK_EX)
+            try:
+                yield refs
+            finally:
+                locks.unlock(refs)
+
+    @staticmethod
+    def _read_refs(refs):
+        refs.seek(0)
+        return int(refs.read() or 0)
+
+    @staticmethod
+    def _write_refs(refs, count):
+        refs.seek(0)
+        refs.truncate()
+        refs.write(str(count))
+        refs.flush()
+
+
+post_image_storage = ContentAddressedStorage()
@@ -0,0 +1,59 @@
+import re
+
+from django.db import transaction
+
+from core.cache import forget_missing
+
+from .models import Mention, PostTag, Tag, User
+
+TAG_RE = re.compile(r'(?<![\w&#])#(\w+)')
+MENTION_RE = re.compile(r'(?<![\w@])@([\w.@+-]+)')
+TAG_MAX_LENGTH = Tag._meta.get_field('name').max_length
+USERNAME_MAX_LENGTH = User._meta.get_field('username').max_length
+
+
+def extract_tags(text):
+    """Теги длиннее поля Tag.name не индексируются, а не обрезаются."""
+    return {
+        name.lower() for name in TAG_RE.findall(text)
+        if len(name) <= TAG_MAX_LENGTH
+    }
+
+
+def extract_mentions(text):
+    names = {name.rstrip('.') for name in MENTION_RE.findall(text)}
+    return {name for name in names if len(name) <= USERNAME_MAX_LENGTH}
+
+
+def sync_links(model, post, field, targets):
+    """Приводит связи поста в model к набору targets одним проходом."""
+    model.objects.filter(post=post).exclude(
+        **{f'{field}__in': targets}
+    ).delete()
+    model.objects.bulk_create(
+        [model(post=post, **{field: target}) for target in targets],
+        ignore_conflicts=True,
+    )
+
+
+def index_post(post):
+    """
+    Разбирает #теги и @упоминания поста и сохраняет их связи.
+
+    Вызывается при создании и правке поста, чтобы ленты тегов
+    и упоминаний читались по индексам, а не поиском по тексту.
+    """
+    names = extract_tags(post.text)
+    with transaction.atomic():
+        tags = [Tag(name=name) for name in names]
+        Tag.objects.bulk_create(tags, ignore_conflicts=True)
+        sync_links(
+            PostTag, post, 'tag', list(Tag.objects.filter(name__in=names))
+        )
+        sync_links(
+            Mention, post, 'user', list(User.objects.filter(
+                username__in=extract_mentions(post.text)
+            ))
+        )
+    for tag in tags:
+        forget_missing(tag, 'name')
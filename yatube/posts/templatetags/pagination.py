@@ -0,0 +1,10 @@
+from django import template
+
+from posts.utils import page_window as build_page_window
+
+register = template.Library()
+
+
+@register.filter
+def page_window(page_obj):
+    return build_page_window(page_obj)
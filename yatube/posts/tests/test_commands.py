@@ -0,0 +1,310 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings,
+)
+from django.urls import reverse
+from django.utils import timezone
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.models import KVStore
+
+from core.cache import get_stats
+
+from ..models import (
+    Comment, Follow, FollowStats, Group, Post, PostScore, Suggestion,
+    TrendingDecay, User,
+)
+from ..storage import post_image_storage
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class WarmCachesCommandTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание группы',
+        )
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Тестовый пост',
+            group=self.group,
+            image=SimpleUploadedFile(
+                name='img1.gif', content=SMALL_GIF, content_type='image/gif'
+            ),
+        )
+
+    def test_warm_caches_fills_index_page(self):
+        """После прогрева первый гость попадает в кэш главной."""
+        out = StringIO()
+        call_command(
+            'warm_caches', pages=1, workers=1, processes=0, stdout=out
+        )
+        self.assertIn('Прогрето 4 из 4', out.getvalue())
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, self.post.text)
+        self.assertEqual(get_stats('index_page')['hits'], 1)
+
+    def test_warm_caches_respects_budget(self):
+        """Задачи за пределами бюджета времени пропускаются."""
+        out = StringIO()
+        call_command('warm_caches', budget=0, processes=0, stdout=out)
+        self.assertIn('Прогрето 0 из 4', out.getvalue())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BackfillImageMetaCommandTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_backfill_fills_missing_meta(self):
+        """Команда заполняет размеры картинок у старых постов."""
+        user = User.objects.create_user(username='author')
+        post = Post.objects.create(
+            author=user,
+            text='Тестовый пост',
+            image=SimpleUploadedFile(
+                name='img1.gif', content=SMALL_GIF, content_type='image/gif'
+            ),
+        )
+        Post.objects.create(author=user, text='Пост без файла', image='x.gif')
+        out, err = StringIO(), StringIO()
+        call_command('backfill_image_meta', stdout=out, stderr=err)
+        self.assertIn('Обновлено 1, ошибок 1', out.getvalue())
+        post.refresh_from_db()
+        self.assertEqual(
+            (post.image_width, post.image_height, post.image_format),
+            (1, 1, 'GIF'),
+        )
+        self.assertEqual(post.image_size, len(SMALL_GIF))
+        self.assertTrue(post.image_placeholder.startswith('data:image/webp'))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaGcCommandTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=User.objects.create_user(username='author'),
+            text='Тестовый пост',
+            image=SimpleUploadedFile(
+                name='img1.gif', content=SMALL_GIF, content_type='image/gif'
+            ),
+        )
+
+    def test_media_gc_removes_orphans_and_their_thumbnails(self):
+        """Картинки без постов удаляются вместе с миниатюрами и KV."""
+        orphan = post_image_storage.save(
+            'posts/orphan.gif', ContentFile(SMALL_GIF + b'orphan')
+        )
+        thumbnail = get_thumbnail(orphan, '10x10')
+        call_command('media_gc', dry_run=True, min_age=0, stdout=StringIO())
+        self.assertTrue(post_image_storage.exists(orphan))
+        out = StringIO()
+        call_command('media_gc', min_age=0, stdout=out)
+        self.assertIn('Картинок-сирот: 2', out.getvalue())
+        self.assertFalse(post_image_storage.exists(orphan))
+        self.assertFalse(post_image_storage.is_refcounted(orphan))
+        self.assertFalse(thumbnail.exists())
+        self.assertFalse(KVStore.objects.filter(value__contains=orphan))
+        self.assertTrue(post_image_storage.exists(self.post.image.name))
+
+    def test_media_gc_evicts_least_recently_used_thumbnails(self):
+        directory = os.path.join(TEMP_MEDIA_ROOT, 'cache', 'ab')
+        os.makedirs(directory, exist_ok=True)
+        for last_used, name in enumerate(('old', 'recent', 'newest'), 1):
+            path = os.path.join(directory, name)
+            with open(path, 'wb') as thumbnail:
+                thumbnail.write(b'x' * 1000)
+            os.utime(path, (last_used, last_used))
+        call_command(
+            'media_gc', thumbnail_budget=2000 / 1024 / 1024, stdout=StringIO()
+        )
+        self.assertEqual(
+            sorted(os.listdir(directory)), ['newest', 'recent']
+        )
+
+
+class RepairCommentCountsCommandTests(TestCase):
+    def test_repair_restores_counts_and_last_comment(self):
+        user = User.objects.create_user(username='commenter')
+        post = Post.objects.create(author=user, text='Тестовый пост')
+        first = Comment.objects.create(post=post, author=user, text='Раз')
+        last = Comment.objects.create(post=post, author=user, text='Два')
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 2)
+        self.assertEqual(post.last_comment_at, last.pub_date)
+        last.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.last_comment_at, first.pub_date)
+        Post.objects.update(comments_count=5, last_comment_at=None)
+        out = StringIO()
+        call_command('repair_comment_counts', stdout=out)
+        self.assertIn('Исправлено постов: 1.', out.getvalue())
+        call_command('repair_comment_counts', stdout=out)
+        self.assertIn('Исправлено постов: 0.', out.getvalue())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(post.last_comment_at, first.pub_date)
+
+
+class RepairFollowCountsCommandTests(TestCase):
+    def test_repair_restores_counts_after_bulk_changes(self):
+        reader, author, other = (
+            User.objects.create_user(username=name)
+            for name in ('reader', 'author', 'other')
+        )
+        Follow.objects.create(user=other, author=author)
+        Follow.objects.bulk_create([
+            Follow(user=reader, author=author),
+            Follow(user=author, author=reader),
+        ])
+        FollowStats.objects.filter(user=other).update(following_count=7)
+        out = StringIO()
+        call_command('repair_follow_counts', dry_run=True, stdout=out)
+        self.assertIn(
+            'Пробный запуск. Исправлено пользователей: 3.', out.getvalue()
+        )
+        call_command('repair_follow_counts', stdout=out)
+        call_command('repair_follow_counts', stdout=out)
+        self.assertIn('Исправлено пользователей: 0.', out.getvalue())
+        self.assertEqual(
+            {
+                stats.user_id: (stats.followers_count, stats.following_count)
+                for stats in FollowStats.objects.all()
+            },
+            {reader.pk: (1, 1), author.pk: (2, 1), other.pk: (0, 1)},
+        )
+
+
+class BackfillExcerptsCommandTests(TestCase):
+    def test_backfill_fills_missing_excerpts(self):
+        user = User.objects.create_user(username='author')
+        post = Post.objects.create(
+            author=user, text='**Старый**   пост со [ссылкой](https://ex.com)'
+        )
+        Post.objects.update(excerpt='')
+        out = StringIO()
+        call_command('backfill_excerpts', batch_size=1, stdout=out)
+        self.assertIn('Обновлено 1.', out.getvalue())
+        post.refresh_from_db()
+        self.assertEqual(post.excerpt, 'Старый пост со ссылкой')
+
+
+class RenderMarkupCommandTests(TestCase):
+    def test_render_markup_updates_stale_html(self):
+        user = User.objects.create_user(username='author')
+        post = Post.objects.create(author=user, text='**Пост**')
+        comment = Comment.objects.create(
+            post=post, author=user, text='*Комментарий*'
+        )
+        self.assertEqual(post.text_html, '<p><strong>Пост</strong></p>')
+        Post.objects.update(text_html='', excerpt='', markup_version=0)
+        Comment.objects.update(text_html='', markup_version=0)
+        out = StringIO()
+        call_command('render_markup', stdout=out)
+        self.assertIn('Посты: обновлено 1.', out.getvalue())
+        post.refresh_from_db()
+        comment.refresh_from_db()
+        self.assertEqual(post.text_html, '<p><strong>Пост</strong></p>')
+        self.assertEqual(post.excerpt, 'Пост')
+        self.assertEqual(comment.text_html, '<p><em>Комментарий</em></p>')
+
+
+class DecayTrendingCommandTests(TestCase):
+    @override_settings(TRENDING_HALF_LIFE=1, TRENDING_MIN_SCORE=0.5)
+    def test_decay_halves_scores_and_drops_faded(self):
+        user = User.objects.create_user(username='author')
+        hot, cold = (
+            Post.objects.create(author=user, text=text)
+            for text in ('Горячий', 'Остывший')
+        )
+        PostScore.objects.create(post=hot, score=4)
+        PostScore.objects.create(post=cold, score=0.8)
+        call_command('decay_trending', interval=60, stdout=StringIO())
+        self.assertEqual(
+            list(PostScore.objects.values_list('post', 'score')),
+            [(hot.pk, 2)],
+        )
+
+    @override_settings(TRENDING_HALF_LIFE=1)
+    def test_decay_uses_time_since_last_run(self):
+        """Множитель считается по времени с прошлого запуска."""
+        user = User.objects.create_user(username='author')
+        post = Post.objects.create(author=user, text='Пост')
+        PostScore.objects.create(post=post, score=8)
+        TrendingDecay.objects.create(
+            decayed_at=timezone.now() - timedelta(hours=2)
+        )
+        call_command('decay_trending', interval=1, stdout=StringIO())
+        self.assertAlmostEqual(
+            PostScore.objects.get(post=post).score, 2, places=3
+        )
+        self.assertLess(
+            timezone.now() - TrendingDecay.objects.get().decayed_at,
+            timedelta(minutes=1),
+        )
+
+
+class RecommendFollowsCommandTests(TestCase):
+    def test_friends_of_friends_are_suggested(self):
+        """Подсказки - авторы, которых читают те, кого читает пользователь."""
+        reader, friend, author, stranger = (
+            User.objects.create_user(username=name)
+            for name in ('reader', 'friend', 'author', 'stranger')
+        )
+        Follow.objects.bulk_create([
+            Follow(user=reader, author=friend),
+            Follow(user=friend, author=author),
+            Follow(user=stranger, author=reader),
+        ])
+        call_command('recommend_follows', processes=0, stdout=StringIO())
+        self.assertEqual(
+            list(Suggestion.objects.filter(user=reader).values_list(
+                'author', 'rank'
+            )),
+            [(author.pk, 1)],
+        )
+        client = Client()
+        client.force_login(reader)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['suggestions'], [author])
+        Follow.objects.create(user=reader, author=author)
+        response = client.get(
+            reverse('posts:profile', args=(friend.username,))
+        )
+        self.assertEqual(response.context['suggestions'], [])
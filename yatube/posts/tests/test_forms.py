@@ -1,18 +1,38 @@
+import hashlib
 import shutil
 import tempfile
+from io import BytesIO
 
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from ..forms import CommentForm, PostForm
 from ..models import Comment, Group, Post, User
+from ..storage import content_name
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
+def image_name(content, extension):
+    digest = hashlib.sha256(content).hexdigest()
+    return content_name('posts', digest, extension)
+
+
+def make_photo(size, orientation, image_format='JPEG'):
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    exif[0x010F] = 'Телефон'
+    buffer = BytesIO()
+    Image.new('RGB', size, 'teal').save(
+        buffer, image_format, exif=exif.tobytes()
+    )
+    return buffer.getvalue()
+
+
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostCreateFormTests(TestCase):
     @classmethod
@@ -70,7 +90,16 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(Post.objects.count(), post_count + COUNT_OFFSET)
         self.assertEqual(test_post.text, form_data['text'])
         self.assertEqual(test_post.group.pk, form_data['group'])
-        self.assertEqual(test_post.image, f"posts/{form_data['image']}")
+        self.assertEqual(test_post.image, image_name(self.image, '.gif'))
+        self.assertEqual(
+            (
+                test_post.image_width,
+                test_post.image_height,
+                test_post.image_format,
+                test_post.image_size,
+            ),
+            (1, 1, 'GIF', len(self.image)),
+        )
 
     def test_edit_post(self):
         """Валидная форма изменяет запись в Post."""
@@ -115,7 +144,46 @@ class PostCreateFormTests(TestCase):
         post = Post.objects.first()
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(post.group.pk, form_data['group'])
-        self.assertEqual(post.image, f"posts/{form_data['image']}")
+        self.assertEqual(post.image, image_name(new_image, '.gif'))
+
+    def test_large_photo_is_normalized(self):
+        """Фото поворачивается по EXIF, ужимается и теряет метаданные."""
+        for image_format, extension in (('JPEG', 'jpg'), ('PNG', 'png')):
+            with self.subTest(image_format=image_format):
+                text = f'Фото с телефона в {image_format}'
+                uploaded = SimpleUploadedFile(
+                    name=f'photo.{extension}',
+                    content=make_photo(
+                        (3000, 1500), orientation=6, image_format=image_format
+                    ),
+                    content_type=f'image/{image_format.lower()}',
+                )
+                self.authorized_client.post(
+                    reverse('posts:post_create'),
+                    data={'text': text, 'image': uploaded},
+                )
+                post = Post.objects.get(text=text)
+                self.assertEqual(
+                    (post.image_width, post.image_height, post.image_format),
+                    (1024, 2048, image_format),
+                )
+                self.assertEqual(post.image_size, post.image.size)
+                self.assertTrue(post.image_placeholder.startswith(
+                    'data:image/webp;base64,'
+                ))
+                self.assertLess(len(post.image_placeholder), 400)
+                with Image.open(post.image) as image:
+                    self.assertEqual(image.size, (1024, 2048))
+                    self.assertEqual(len(image.getexif()), 0)
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=0)
+    def test_oversized_image_is_rejected(self):
+        form = PostForm(
+            data={'text': 'Тестовый пост'},
+            files={'image': self.uploaded},
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -172,6 +240,11 @@ class CommentsFormTests(TestCase):
         )
         comment = Comment.objects.first()
         self.assertEqual(comment.text, form_data['text'])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, COUNT_OFFSET)
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
 
     def test_guest_cant_commenting(self):
         """
@@ -0,0 +1,44 @@
+from django.test import SimpleTestCase
+
+from ..markup import render_markdown
+
+
+class RenderMarkdownTests(SimpleTestCase):
+    def test_inline_markup(self):
+        cases = {
+            '**жирный** и *курсив*':
+                '<p><strong>жирный</strong> и <em>курсив</em></p>',
+            'snake_case_name': '<p>snake_case_name</p>',
+            'вызов `a < b`': '<p>вызов <code>a &lt; b</code></p>',
+            '[сайт](https://example.com/?a=1&b=2)':
+                '<p><a href="https://example.com/?a=1&amp;b=2" '
+                'rel="nofollow noopener">сайт</a></p>',
+            'строка\nещё одна\n\nабзац':
+                '<p>строка<br>ещё одна</p>\n<p>абзац</p>',
+        }
+        for source, html in cases.items():
+            with self.subTest(source=source):
+                self.assertEqual(render_markdown(source), html)
+
+    def test_html_and_unsafe_links_are_neutralized(self):
+        """Пользовательский HTML экранируется, опасные ссылки не создаются."""
+        cases = {
+            '<script>alert(1)</script>':
+                '<p>&lt;script&gt;alert(1)&lt;/script&gt;</p>',
+            '[клик](javascript:void)': '<p>клик</p>',
+            '[клик](//evil.example)': '<p>клик</p>',
+            '[клик](/\\evil.example)': '<p>клик</p>',
+            '[x](/"onmouseover="alert(1))':
+                '<p><a href="/&quot;onmouseover=&quot;alert(1" '
+                'rel="nofollow noopener">x</a>)</p>',
+        }
+        for source, html in cases.items():
+            with self.subTest(source=source):
+                self.assertEqual(render_markdown(source), html)
+
+    def test_code_block_is_not_formatted(self):
+        self.assertEqual(
+            render_markdown('до\n```\n**x** <b>\n```\nпосле'),
+            '<p>до</p>\n<pre><code>**x** &lt;b&gt;</code></pre>\n'
+            '<p>после</p>',
+        )
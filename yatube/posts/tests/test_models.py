@@ -1,6 +1,7 @@
 from django.test import TestCase
 
 from ..models import Group, Post, User
+from ..utils import EXCERPT_LENGTH, make_excerpt
 
 
 class PostModelTest(TestCase):
@@ -34,3 +35,21 @@ class PostModelTest(TestCase):
             PostModelTest.group.title,
             'Вывод __str__ модели Group не соответствует полю title.'
         )
+
+    def test_excerpt_is_generated_on_save(self):
+        """Начало текста обрезается по слову и очищается от Markdown."""
+        post = Post.objects.create(
+            author=self.user, text='**Слово**   ' + 'слово ' * 100
+        )
+        self.assertTrue(post.excerpt.startswith('Слово слово'))
+        self.assertTrue(post.excerpt_is_truncated)
+        self.assertLessEqual(len(post.excerpt), EXCERPT_LENGTH + 1)
+        self.assertTrue(post.excerpt[:-1].endswith('слово'))
+        post.text = 'Короткий текст'
+        post.save(update_fields=['text'])
+        post.refresh_from_db()
+        self.assertEqual(post.excerpt, 'Короткий текст')
+        self.assertFalse(post.excerpt_is_truncated)
+
+    def test_excerpt_cuts_long_word(self):
+        self.assertEqual(len(make_excerpt('ы' * 1000)), EXCERPT_LENGTH + 1)
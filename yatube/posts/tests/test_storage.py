@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from ..models import Post, User
+from ..storage import post_image_storage
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='admin')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_name_is_sharded_content_hash(self):
+        """Имя файла строится из хэша и разложено по вложенным каталогам."""
+        name = post_image_storage.save('posts/photo.JPG', ContentFile(b'1'))
+        directory, first, second, filename = name.split('/')
+        self.assertEqual(directory, 'posts')
+        self.assertTrue(filename.startswith(first + second))
+        self.assertTrue(filename.endswith('.jpg'))
+        self.assertTrue(post_image_storage.exists(name))
+
+    def test_identical_uploads_share_one_file(self):
+        """Одинаковые загрузки хранятся одним файлом со счётчиком ссылок."""
+        first = post_image_storage.save('posts/a.gif', ContentFile(b'same'))
+        second = post_image_storage.save('posts/b.gif', ContentFile(b'same'))
+        self.assertEqual(first, second)
+        self.assertEqual(post_image_storage.refcount(first), 2)
+        post_image_storage.delete(first)
+        self.assertTrue(post_image_storage.exists(first))
+        post_image_storage.delete(first)
+        self.assertFalse(post_image_storage.exists(first))
+        leftovers = [
+            filename
+            for _, _, filenames in os.walk(post_image_storage.path('posts'))
+            for filename in filenames
+            if filename.startswith('.upload-')
+        ]
+        self.assertEqual(leftovers, [])
+
+    def test_deleted_post_releases_image(self):
+        """Удаление поста снимает ссылку с картинки."""
+        posts = [
+            Post.objects.create(
+                author=self.user,
+                text='Тестовый пост',
+                image=ContentFile(b'shared', name='shared.gif'),
+            )
+            for _ in range(2)
+        ]
+        name = posts[0].image.name
+        posts[0].delete()
+        self.assertTrue(post_image_storage.exists(name))
+        posts[1].image = ContentFile(b'other', name='other.gif')
+        posts[1].save()
+        self.assertFalse(post_image_storage.exists(name))
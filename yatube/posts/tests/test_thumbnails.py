@@ -0,0 +1,52 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+
+from ..storage import post_image_storage
+from ..thumbnails import DraftEngine
+from ..utils import THUMBNAIL_GEOMETRY, THUMBNAIL_OPTIONS
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+OPTIONS = dict(ThumbnailBackend.default_options, **THUMBNAIL_OPTIONS)
+
+
+def make_jpeg(size):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'teal').save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class DraftEngineTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_jpeg_is_decoded_reduced(self):
+        """JPEG декодируется уменьшенным, но не меньше миниатюры."""
+        image = Image.open(BytesIO(make_jpeg((2400, 1800))))
+        DraftEngine().draft(image, (960, 339), OPTIONS)
+        self.assertEqual(image.size, (1200, 900))
+
+    def test_thumbnail_has_feed_geometry(self):
+        name = post_image_storage.save(
+            'posts/photo.jpg', ContentFile(make_jpeg((2400, 1800)))
+        )
+        thumbnail = get_thumbnail(
+            name, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS
+        )
+        self.assertEqual((thumbnail.width, thumbnail.height), (960, 339))
+
+    @override_settings(THUMBNAIL_MAX_DECODED_PIXELS=1000)
+    def test_oversized_image_is_not_decoded(self):
+        image = Image.open(BytesIO(make_jpeg((400, 300))))
+        with self.assertRaises(Image.DecompressionBombError):
+            DraftEngine().create(image, (40, 40), OPTIONS)
@@ -150,3 +150,43 @@ class PostsURLTests(TestCase):
         """
         response = self.guest_client.get('/nonexistent_page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_missing_objects_are_cached(self):
+        """
+        Повторный запрос несуществующего профиля, группы или поста
+        не обращается к базе и отдаёт готовую страницу 404.
+        """
+        missing_urls = (
+            '/profile/nobody/',
+            '/group/missing-slug/',
+            '/posts/100500/',
+        )
+        for address in missing_urls:
+            with self.subTest(address=address):
+                cache.clear()
+                response = self.guest_client.get(address)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+                with self.assertNumQueries(0):
+                    response = self.guest_client.get(address)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+                self.assertContains(
+                    response, address, status_code=HTTPStatus.NOT_FOUND
+                )
+
+    def test_cached_miss_keeps_user_header(self):
+        """Авторизованный пользователь видит на 404 свою шапку."""
+        cache.clear()
+        self.guest_client.get('/posts/100500/')
+        response = self.authorized_client.get('/posts/100500/')
+        self.assertContains(
+            response, 'Выйти', status_code=HTTPStatus.NOT_FOUND
+        )
+
+    def test_missing_cache_dropped_on_create(self):
+        """Созданный объект сразу становится доступен."""
+        cache.clear()
+        response = self.guest_client.get('/profile/newcomer/')
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        User.objects.create_user(username='newcomer')
+        response = self.guest_client.get('/profile/newcomer/')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
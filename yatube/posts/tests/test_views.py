@@ -1,16 +1,27 @@
 import shutil
 import tempfile
 from http import HTTPStatus
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection
 from django.shortcuts import get_object_or_404
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Follow, Group, Post, User
+from core.cache import get_stats
+
+from ..counts import ALL_SCOPE, MaintainedCount
+from ..hits import flush_views, take_pending
+from ..models import Comment, Follow, Group, Post, PostTag, User
+from ..rows import PostRow
+from ..utils import (
+    COMMENTS_PER_PAGE, HAS_NEXT, MAX_POSTS, page_window, pages,
+)
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -137,6 +148,42 @@ class PostsViewsTests(TestCase):
         responce_third = self.client.get(reverse('posts:index'))
         self.assertNotEqual(response_second.content, responce_third.content)
 
+    def test_anonymous_cache_ignores_cookies(self):
+        """Гости с разными cookie получают одну запись кэша."""
+        response_first = self.guest_client.get(reverse('posts:index'))
+        Post.objects.filter(pk=self.post.pk).update(text='Изменённый пост')
+        self.guest_client.cookies['tracking'] = 'abc'
+        response_second = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(response_first.content, response_second.content)
+
+    def test_anonymous_cache_normalizes_query(self):
+        """Лишние параметры и неверный номер страницы не плодят записи."""
+        response_first = self.guest_client.get(reverse('posts:index'))
+        Post.objects.filter(pk=self.post.pk).update(text='Изменённый пост')
+        for query in ('?page=abc', '?page=1&utm_source=mail', '?page=999'):
+            with self.subTest(query=query):
+                response = self.guest_client.get(
+                    reverse('posts:index') + query
+                )
+                self.assertEqual(response.content, response_first.content)
+        stats = get_stats('index_page')
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 3)
+        self.assertEqual(stats['normalized'], 3)
+
+    def test_authorized_index_uses_shared_fragment(self):
+        """Авторизованный пользователь видит общий фрагмент ленты."""
+        self.guest_client.get(reverse('posts:index'))
+        Post.objects.filter(pk=self.post.pk).update(text='Изменённый пост')
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, self.user.username)
+        self.assertContains(response, self.post.text)
+        self.assertNotContains(response, 'Изменённый пост')
+        post = Post.objects.get(pk=self.post.pk)
+        post.save()
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Изменённый пост')
+
 
 CNT_POSTS_FIRST_PAGE = 10
 CNT_POSTS_SECOND_PAGE = 3
@@ -208,6 +255,75 @@ class DisplayingManyPostsTest(TestCase):
                     CNT_POSTS_SECOND_PAGE
                 )
 
+    def test_paginator_window_is_bounded(self):
+        """Навигация показывает окно вокруг текущей страницы."""
+        paginator = pages(range(1000))
+        self.assertEqual(
+            page_window(paginator.get_page(50)),
+            [1, None, 48, 49, 50, 51, 52, None, 100],
+        )
+        self.assertEqual(
+            page_window(paginator.get_page(2)), [1, 2, 3, 4, None, 100]
+        )
+        self.assertEqual(page_window(pages(range(25)).get_page(1)), [1, 2, 3])
+
+    def test_has_next_paginator_does_not_count(self):
+        paginator = pages(Post.objects.all(), HAS_NEXT)
+        with self.assertNumQueries(1):
+            page_obj = paginator.get_page(1)
+        self.assertEqual(len(page_obj), CNT_POSTS_FIRST_PAGE)
+        self.assertTrue(page_obj.has_next())
+        page_obj = paginator.get_page(2)
+        self.assertEqual(len(page_obj), CNT_POSTS_SECOND_PAGE)
+        self.assertFalse(page_obj.has_next())
+
+    def test_feeds_read_row_projection(self):
+        """Ленты не создают модели и не читают лишние колонки автора."""
+        for reverse_name in self.testing_pages:
+            with self.subTest(reverse_name=reverse_name):
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(reverse_name)
+                self.assertIsInstance(
+                    response.context['page_obj'][POST_ZERO], PostRow
+                )
+                feed_queries = [
+                    query['sql'] for query in queries
+                    if 'posts_post' in query['sql']
+                ]
+                for sql in feed_queries:
+                    self.assertNotIn('password', sql)
+
+    def test_fragment_hit_skips_feed_query(self):
+        """При попадании во фрагмент страница ленты не читается из базы."""
+        self.client.force_login(self.user)
+        for reverse_name in self.testing_pages:
+            with self.subTest(reverse_name=reverse_name):
+                cache.clear()
+                self.client.get(reverse_name)
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(reverse_name)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertFalse([
+                    query['sql'] for query in queries
+                    if 'FROM "posts_post"' in query['sql']
+                ])
+
+    def test_maintained_count_follows_signals(self):
+        """Счётчик ленты меняется без пересчёта при публикации."""
+        cache.clear()
+        posts = Post.objects.all()
+        total = CNT_POSTS_FIRST_PAGE + CNT_POSTS_SECOND_PAGE
+        self.assertEqual(MaintainedCount(posts, ALL_SCOPE).count(), total)
+        post = Post.objects.create(author=self.user, text='Новый пост')
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                MaintainedCount(posts, ALL_SCOPE).count(), total + 1
+            )
+        post.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(MaintainedCount(posts, ALL_SCOPE).count(), total)
+
     def test_posts_pages_list(self):
         """
         На страницы index, group_list, profile
@@ -226,13 +342,12 @@ class DisplayingManyPostsTest(TestCase):
     def page_obj_handler(self, response):
         self.assertIn('page_obj', response.context)
         post_object = response.context['page_obj'][POST_ZERO]
-        post_text = post_object.text
+        post_text = post_object.excerpt
         post_author = post_object.author
         post_group = post_object.group
         post_image = post_object.image
         group_title = post_group.title
         group_slug = post_group.slug
-        group_description = post_group.description
         post_reference = self.posts[POST_ZERO]
         group_reference = self.posts[POST_ZERO].group
         self.assertEqual(post_text, post_reference.text)
@@ -240,7 +355,6 @@ class DisplayingManyPostsTest(TestCase):
         self.assertEqual(post_image, f'{post_image.name}')
         self.assertEqual(group_title, group_reference.title)
         self.assertEqual(group_slug, group_reference.slug)
-        self.assertEqual(group_description, group_reference.description)
 
     def test_index_page_show_correct_context(self):
         """Шаблон index сформирован с правильным контекстом."""
@@ -404,6 +518,49 @@ class FollowsTests(TestCase):
         self.assertEqual(follow.user, self.user_follower)
         self.assertEqual(follow.author, self.user_author)
 
+    def test_follow_is_idempotent_and_counted(self):
+        """
+        Повторная подписка не создаёт дубль, а счётчики подписчиков
+        и подписок меняются ровно на единицу.
+        """
+        cache.clear()
+        url = reverse('posts:profile_follow', args=(self.user_author,))
+        self.authorized_user_follower.get(url)
+        self.authorized_user_follower.get(url)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.user_author.refresh_from_db()
+        self.assertEqual(self.user_author.follow_stats.followers_count, 1)
+        response = self.authorized_user_follower.get(
+            reverse('posts:profile', args=(self.user_author,))
+        )
+        self.assertTrue(response.context['following'])
+        self.authorized_user_follower.get(
+            reverse('posts:profile_unfollow', args=(self.user_author,))
+        )
+        response = self.authorized_user_follower.get(
+            reverse('posts:profile', args=(self.user_author,))
+        )
+        self.assertFalse(response.context['following'])
+        self.assertEqual(response.context['follow_stats'].followers_count, 0)
+
+    def test_trending_marks_followed_authors(self):
+        """В популярном отмечены авторы, на которых подписан читатель."""
+        cache.clear()
+        self.authorized_user_follower.get(
+            reverse('posts:profile_follow', args=(self.user_author,))
+        )
+        for client, followed in (
+            (self.authorized_user_follower, {self.user_author.pk}),
+            (self.authorized_user_notfollower, set()),
+        ):
+            with self.subTest(followed=followed):
+                response = client.get(reverse('posts:trending'))
+                self.assertEqual(response.context['followed'], followed)
+        self.assertContains(
+            self.authorized_user_follower.get(reverse('posts:trending')),
+            '(вы подписаны)',
+        )
+
     def test_unfollowing(self):
         """
         Проверяем, что авторизованный пользователь может отписаться
@@ -446,3 +603,279 @@ class FollowsTests(TestCase):
             len(notfollower_response.context['page_obj']),
             count_author_posts,
         )
+
+    def test_follow_feed_pages_without_count(self):
+        """Лента подписок листается без COUNT и без ссылки «Последняя»."""
+        cache.clear()
+        Follow.objects.create(user=self.user_follower, author=self.user_author)
+        Post.objects.bulk_create([
+            Post(author=self.user_author, text=f'Пост {number}')
+            for number in range(MAX_POSTS)
+        ])
+        url = reverse('posts:follow_index')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_user_follower.get(url)
+        self.assertFalse([
+            query['sql'] for query in queries if 'COUNT(' in query['sql']
+        ])
+        self.assertTrue(response.context['page_obj'].has_next())
+        self.assertNotContains(response, 'Последняя')
+        response = self.authorized_user_follower.get(url, {'page': 2})
+        self.assertEqual(len(response.context['page_obj']), 1)
+        self.assertFalse(response.context['page_obj'].has_next())
+
+    def test_follow_feed_is_cached_until_author_publishes(self):
+        """
+        Лента подписок берётся из кэша и сбрасывается, когда автор,
+        на которого подписан пользователь, публикует новый пост.
+        """
+        cache.clear()
+        Follow.objects.create(
+            user=self.user_follower,
+            author=self.user_author,
+        )
+        url = reverse('posts:follow_index')
+        self.authorized_user_follower.get(url)
+        Post.objects.bulk_create([
+            Post(author=self.user_author, text='Пост без сигналов'),
+        ])
+        response = self.authorized_user_follower.get(url)
+        self.assertEqual(len(response.context['page_obj']), 1)
+        self.assertFalse(response.context['no_subscriptions'])
+        Post.objects.create(author=self.user_author, text='Новый пост')
+        response = self.authorized_user_follower.get(url)
+        self.assertEqual(len(response.context['page_obj']), 3)
+        self.assertContains(response, 'Новый пост')
+
+
+class CommentPagesTests(TestCase):
+    EXTRA_COMMENTS = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='commenter')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        for number in range(COMMENTS_PER_PAGE + cls.EXTRA_COMMENTS):
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {number}'
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_first_page_is_rendered_inline(self):
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(list(comments)), COMMENTS_PER_PAGE)
+        self.assertEqual(
+            response.context['post'].comments_count,
+            COMMENTS_PER_PAGE + self.EXTRA_COMMENTS,
+        )
+        self.assertContains(
+            response, f'?before={comments.next_cursor}'
+        )
+
+    def test_more_comments_fragment(self):
+        """Фрагмент отдаёт следующие комментарии за курсором."""
+        url = reverse('posts:post_comments', args=(self.post.pk,))
+        newest = Comment.objects.order_by('-pk')
+        cursor = newest[COMMENTS_PER_PAGE - 1].pk
+        response = self.client.get(url, {'before': cursor})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            [comment.pk for comment in response.context['comments']],
+            list(newest.filter(pk__lt=cursor).values_list('pk', flat=True)),
+        )
+        self.assertIsNone(response.context['comments'].next_cursor)
+        self.assertNotContains(response, 'data-load-more')
+        response = self.client.get(url, {'before': 'x'})
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_deleting_post_skips_comment_counter_updates(self):
+        """Каскадное удаление комментариев не пересчитывает сам пост."""
+        post = Post.objects.get(pk=self.post.pk)
+        with CaptureQueriesContext(connection) as queries:
+            post.delete()
+        self.assertFalse([
+            query['sql'] for query in queries
+            if query['sql'].startswith('UPDATE "posts_post"')
+        ])
+        self.assertFalse(Comment.objects.exists())
+
+
+class TagFeedsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='writer')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def publish(self, text):
+        self.client.post(reverse('posts:post_create'), {'text': text})
+        return Post.objects.filter(author=self.user).latest('pk')
+
+    def test_tags_and_mentions_are_indexed_on_write(self):
+        post = self.publish('Пишу про #Django, привет @reader.')
+        response = self.client.get(
+            reverse('posts:tag_posts', args=('django',))
+        )
+        self.assertEqual(list(response.context['posts']), [post])
+        response = self.client.get(
+            reverse('posts:mention_posts', args=(self.reader.username,))
+        )
+        self.assertEqual(list(response.context['posts']), [post])
+        self.client.post(
+            reverse('posts:post_edit', args=(post.pk,)), {'text': '#python'}
+        )
+        self.assertEqual(
+            list(PostTag.objects.values_list('tag__name', flat=True)),
+            ['python'],
+        )
+        response = self.client.get(
+            reverse('posts:mention_posts', args=(self.reader.username,))
+        )
+        self.assertEqual(list(response.context['posts']), [])
+
+    def test_too_long_tag_is_not_indexed(self):
+        """Тег длиннее Tag.name пропускается, а не обрезается."""
+        self.publish('#' + 'a' * 60 + ' #короткий')
+        self.assertEqual(
+            list(PostTag.objects.values_list('tag__name', flat=True)),
+            ['короткий'],
+        )
+
+    def test_tag_feed_pages_by_cursor(self):
+        """Лента тега листается курсором и не ищет по тексту."""
+        posts = [
+            self.publish(f'Пост {number} #лента')
+            for number in range(MAX_POSTS + 2)
+        ]
+        url = reverse('posts:tag_posts', args=('лента',))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertFalse(
+            any('LIKE' in query['sql'] for query in queries)
+        )
+        self.assertEqual(
+            list(response.context['posts']), posts[:1:-1]
+        )
+        response = self.client.get(
+            url, {'before': response.context['next_cursor']}
+        )
+        self.assertEqual(list(response.context['posts']), posts[1::-1])
+        self.assertIsNone(response.context['next_cursor'])
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='-'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_guest_cache_ignores_page_param(self):
+        """У популярного нет страниц: ?page не плодит записи в кэше."""
+        guest = Client()
+        for query in ('', '?page=2', '?page=3'):
+            guest.get(reverse('posts:trending') + query)
+        stats = get_stats('trending_page')
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 2)
+
+    def test_activity_raises_posts_and_groups(self):
+        author_client = Client()
+        author_client.force_login(self.author)
+        for text in ('Тихий пост', 'Громкий пост'):
+            author_client.post(
+                reverse('posts:post_create'),
+                {'text': text, 'group': self.group.pk},
+            )
+        quiet, loud = Post.objects.order_by('pk')
+        self.client.post(
+            reverse('posts:add_comment', args=(loud.pk,)), {'text': 'Да!'}
+        )
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('posts:trending'))
+        self.assertEqual(list(response.context['posts']), [loud, quiet])
+        self.assertEqual(response.context['groups'], [self.group])
+        self.client.get(
+            reverse('posts:profile_follow', args=(self.author.username,))
+        )
+        self.assertEqual(loud.trending_score.score, 1 + 1 + 2)
+
+
+class ViewCountsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=f'Пост {number}')
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        take_pending()
+
+    @override_settings(VIEW_FLUSH_INTERVAL=3600)
+    def test_views_are_written_in_one_batch(self):
+        """
+        Просмотры копятся в памяти и попадают в базу одним UPDATE
+        на все посты сразу.
+        """
+        first, second, untouched = self.posts
+        for post, views in ((first, 3), (second, 1)):
+            for _ in range(views):
+                self.client.get(reverse('posts:post_detail', args=(post.pk,)))
+        first.refresh_from_db()
+        self.assertEqual(first.views_count, 0)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(flush_views(), 2)
+        updates = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('UPDATE')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('CASE', updates[0])
+        self.assertEqual(
+            dict(Post.objects.values_list('pk', 'views_count')),
+            {first.pk: 3, second.pk: 1, untouched.pk: 0},
+        )
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Просмотров: 3')
+
+    @override_settings(VIEW_FLUSH_INTERVAL=0)
+    def test_views_are_flushed_when_interval_passes(self):
+        post = self.posts[0]
+        self.client.get(reverse('posts:post_detail', args=(post.pk,)))
+        post.refresh_from_db()
+        self.assertEqual(post.views_count, 1)
+
+    @override_settings(VIEW_FLUSH_INTERVAL=0)
+    def test_failed_flush_keeps_views_and_serves_page(self):
+        """Ошибка базы при сбросе не ломает страницу и не теряет просмотры."""
+        post = self.posts[0]
+        url = reverse('posts:post_detail', args=(post.pk,))
+        with mock.patch(
+            'posts.hits.write_views', side_effect=DatabaseError('locked')
+        ), self.assertLogs('posts.hits', 'ERROR'):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.client.get(url)
+        post.refresh_from_db()
+        self.assertEqual(post.views_count, 2)
+
+    def test_empty_flush_does_not_touch_database(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(flush_views(), 0)
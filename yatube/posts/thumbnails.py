@@ -0,0 +1,88 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import django
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.engines.pil_engine import Engine
+
+from .utils import THUMBNAIL_GEOMETRY, THUMBNAIL_OPTIONS
+
+REDUCING_GAP = 2
+
+
+class DraftEngine(Engine):
+    """
+    Движок sorl-thumbnail, который не декодирует оригинал целиком.
+
+    JPEG сразу декодируется в уменьшенном в 2, 4 или 8 раз виде
+    (Image.draft), затем картинка быстро ужимается целым множителем
+    (Image.reduce) и только остаток масштабируется фильтром LANCZOS.
+    Файл открывается с диска без копирования в память, а оригиналы,
+    которые даже после draft больше THUMBNAIL_MAX_DECODED_PIXELS,
+    не декодируются вовсе.
+    """
+
+    def get_image(self, source):
+        try:
+            path = source.storage.path(source.name)
+        except NotImplementedError:
+            return super().get_image(source)
+        return Image.open(path)
+
+    def create(self, image, geometry, options):
+        if not options['cropbox']:
+            self.draft(image, geometry, options)
+        width, height = image.size
+        if width * height > settings.THUMBNAIL_MAX_DECODED_PIXELS:
+            raise Image.DecompressionBombError(
+                f'Картинка {width}x{height} слишком велика для миниатюры.'
+            )
+        return super().create(image, geometry, options)
+
+    def draft(self, image, geometry, options):
+        """Просит декодер сразу отдать картинку не меньше нужного размера."""
+        width, height = image.size
+        if self.flip_dimensions(image, geometry, options):
+            geometry = geometry[::-1]
+        factor = self._calculate_scaling_factor(
+            width, height, geometry, options
+        ) * max([1, *settings.THUMBNAIL_ALTERNATIVE_RESOLUTIONS])
+        if factor < 1:
+            image.draft(
+                image.mode,
+                (math.ceil(width * factor), math.ceil(height * factor)),
+            )
+
+    def _scale(self, image, width, height):
+        width, height = max(width, 1), max(height, 1)
+        factor = min(
+            image.width // (width * REDUCING_GAP),
+            image.height // (height * REDUCING_GAP),
+        )
+        if factor > 1 and image.mode not in ('1', 'P'):
+            image = image.reduce(factor)
+        return image.resize((width, height), resample=Image.LANCZOS)
+
+
+def render_thumbnail(name):
+    """Создаёт миниатюру ленты для картинки поста."""
+    get_thumbnail(name, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS)
+
+
+def thumbnail_pool(processes=None):
+    """
+    Пул процессов для пакетной генерации миниатюр.
+
+    Масштабирование упирается в процессор, поэтому миниатюры
+    режутся в отдельных процессах на всех ядрах. Процессы запускаются
+    через spawn и сами настраивают Django, не наследуя соединения
+    с базой и блокировки родителя.
+    """
+    return ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=get_context('spawn'),
+        initializer=django.setup,
+    )
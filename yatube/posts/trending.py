@@ -0,0 +1,63 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import GroupScore, Post, PostScore
+from .rows import posts_by_ids
+
+COMMENT_WEIGHT = 1
+PUBLISH_WEIGHT = 1
+FOLLOW_WEIGHT = 2
+TRENDING_POSTS = 10
+TRENDING_GROUPS = 5
+
+
+def add_score(model, key, weight):
+    """Прибавляет вес к рейтингу, создавая строку при первом событии."""
+    scores = model.objects.filter(**key)
+    if scores.update(score=F('score') + weight):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(score=weight, **key)
+    except IntegrityError:
+        scores.update(score=F('score') + weight)
+
+
+def record_activity(post_id, group_id, weight):
+    add_score(PostScore, {'post_id': post_id}, weight)
+    if group_id is not None:
+        add_score(GroupScore, {'group_id': group_id}, weight)
+
+
+def record_post(post):
+    record_activity(post.pk, post.group_id, PUBLISH_WEIGHT)
+
+
+def record_comment(comment):
+    record_activity(comment.post_id, comment.post.group_id, COMMENT_WEIGHT)
+
+
+def record_follow(author):
+    """Новый подписчик поднимает последний пост автора."""
+    latest = Post.objects.filter(author=author).values(
+        'pk', 'group_id'
+    ).first()
+    if latest is not None:
+        record_activity(latest['pk'], latest['group_id'], FOLLOW_WEIGHT)
+
+
+def trending_posts(size=TRENDING_POSTS):
+    """Самые популярные посты: один проход по индексу рейтинга."""
+    return posts_by_ids(list(
+        PostScore.objects.order_by('-score').values_list(
+            'post_id', flat=True
+        )[:size]
+    ))
+
+
+def trending_groups(size=TRENDING_GROUPS):
+    return [
+        score.group for score in GroupScore.objects.select_related(
+            'group'
+        ).order_by('-score')[:size]
+    ]
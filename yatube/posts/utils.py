@@ -1,7 +1,169 @@
-from django.core.paginator import Paginator
+from html import unescape
 
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.http import Http404
+from django.utils.functional import cached_property
+from django.utils.html import strip_tags
+from django.utils.translation import gettext_lazy as _
+
+COMMENTS_PER_PAGE = 20
+ELLIPSIS = '…'
+EXCERPT_LENGTH = 300
+HAS_NEXT = object()
 MAX_POSTS = 10
+PAGE_WINDOW = 2
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    """
+    Начало текста для ленты: без разметки и лишних пробелов.
+
+    Длинный текст обрезается по последней целой фразе или слову,
+    помещающимся в length символов, и получает многоточие.
+    """
+    text = ' '.join(unescape(strip_tags(text)).split())
+    if len(text) <= length:
+        return text
+    head = text[:length + 1]
+    if ' ' in head:
+        head = head.rsplit(' ', 1)[0]
+    else:
+        head = text[:length]
+    return head.rstrip(' ,.;:-—') + ELLIPSIS
+
+
+class FeedPaginator(Paginator):
+    """Paginator, который узнаёт число объектов у стратегии подсчёта."""
+
+    count_is_exact = True
+
+    def __init__(self, object_list, per_page, counter=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.counter = counter
+
+    @cached_property
+    def count(self):
+        if self.counter is None:
+            return super().count
+        return self.counter.count()
+
+
+class HasNextPaginator(Paginator):
+    """
+    Постраничный вывод вообще без подсчёта.
+
+    Страница читается с одним лишним объектом, который только говорит,
+    есть ли следующая, поэтому число страниц известно лишь до неё.
+    Точный подсчёт нужен, только если запрошена страница за концом.
+    """
+
+    count_is_exact = False
+
+    def page(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_('That page number is not an integer'))
+        if number < 1:
+            raise EmptyPage(_('That page number is less than 1'))
+        bottom = (number - 1) * self.per_page
+        object_list = list(
+            self.object_list[bottom:bottom + self.per_page + 1]
+        )
+        if not object_list and number > 1:
+            raise EmptyPage(_('That page contains no results'))
+        self.count = bottom + len(object_list)
+        self.__dict__.pop('num_pages', None)
+        return self._get_page(object_list[:self.per_page], number, self)
+
+    def get_page(self, number):
+        try:
+            return self.page(number)
+        except PageNotAnInteger:
+            return self.page(1)
+        except EmptyPage:
+            self.__dict__.pop('count', None)
+            self.__dict__.pop('num_pages', None)
+            return self.page(self.num_pages)
+
+
+def pages(post_list, counter=None):
+    """
+    Paginator для ленты.
+
+    counter - стратегия подсчёта из posts.counts; без неё выполняется
+    обычный COUNT(*), а с HAS_NEXT страницы листаются без подсчёта.
+    """
+    if counter is HAS_NEXT:
+        return HasNextPaginator(post_list, MAX_POSTS)
+    return FeedPaginator(post_list, MAX_POSTS, counter)
+
+
+def page_window(page_obj, size=PAGE_WINDOW):
+    """
+    Номера страниц вокруг текущей для постраничной навигации.
+
+    Первая и последняя страницы есть всегда, а пропуски между ними
+    и окном обозначены None, так что список не длиннее 2 * size + 5
+    при любом числе страниц.
+    """
+    last = page_obj.paginator.num_pages
+    start = max(page_obj.number - size, 1)
+    end = min(page_obj.number + size, last)
+    window = []
+    if start > 1:
+        window.append(1)
+    if start > 2:
+        window.append(None)
+    window.extend(range(start, end + 1))
+    if end < last - 1:
+        window.append(None)
+    if end < last:
+        window.append(last)
+    return window
+
+
+class CursorPage:
+    """
+    Страница по курсору, от новых записей к старым.
+
+    Курсор - значение key у последней показанной записи, следующая
+    страница читается по индексу с условием key < курсор, без OFFSET
+    и без подсчёта. Запрос выполняется при первом обращении, так что
+    закэшированный фрагмент шаблона не трогает базу.
+    """
+
+    def __init__(
+        self, items, before=None, size=COMMENTS_PER_PAGE, key='pk'
+    ):
+        if before is not None:
+            items = items.filter(**{f'{key}__lt': before})
+        self.items = items.order_by(f'-{key}')
+        self.size = size
+        self.key = key
+
+    @cached_property
+    def rows(self):
+        return list(self.items[:self.size + 1])
+
+    def __iter__(self):
+        return iter(self.rows[:self.size])
+
+    @property
+    def next_cursor(self):
+        if len(self.rows) > self.size:
+            return getattr(self.rows[self.size - 1], self.key)
+        return None
 
 
-def pages(post_list):
-    return Paginator(post_list, MAX_POSTS)
+def cursor_param(request):
+    """Курсор из ?before=, None для первой страницы."""
+    before = request.GET.get('before')
+    if before is None:
+        return None
+    try:
+        return int(before)
+    except ValueError:
+        raise Http404
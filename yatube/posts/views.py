@@ -1,36 +1,88 @@
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.template.response import TemplateResponse
+from django.views.decorators.http import require_safe
 
+from core.cache import anonymous_cache_page, get_cached_object_or_404
+
+from .cache import FollowFeed
+from .counts import (
+    ALL_SCOPE, CachedCount, MaintainedCount, author_scope, group_scope,
+)
+from .follows import (
+    follow, follow_stats, following_ids, is_following, unfollow,
+)
 from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post, User
-from .utils import pages
+from .hits import record_view
+from .models import (
+    Comment, Group, Mention, Post, PostTag, Suggestion, Tag, User,
+)
+from .rows import FeedRows, posts_by_ids
+from .tags import index_post
+from .trending import (
+    record_comment, record_follow, record_post, trending_groups,
+    trending_posts,
+)
+from .utils import HAS_NEXT, MAX_POSTS, CursorPage, cursor_param, pages
 
 CACHE_DELAY = 20
+SUGGESTIONS_SHOWN = 5
+
+
+def suggested_authors(user):
+    """Подсказки «кого почитать» из таблицы, без уже читаемых авторов."""
+    if not user.is_authenticated:
+        return []
+    return [
+        suggestion.author for suggestion in Suggestion.objects.filter(
+            user=user
+        ).exclude(
+            author__in=following_ids(user)
+        ).select_related('author').order_by('rank')[:SUGGESTIONS_SHOWN]
+    ]
 
 
-@cache_page(CACHE_DELAY, key_prefix='index_page')
+@anonymous_cache_page(CACHE_DELAY, key_prefix='index_page')
 def index(request):
     template = 'posts/index.html'
-    post_list = Post.objects.select_related('author', 'group')
+    post_list = Post.objects.all()
     page_number = request.GET.get('page')
-    page_obj = pages(post_list).get_page(page_number)
+    paginator = pages(
+        FeedRows(post_list), MaintainedCount(post_list, ALL_SCOPE)
+    )
+    page_obj = paginator.get_page(page_number)
     context = {
         'page_obj': page_obj,
     }
-    return render(request, template, context)
+    return TemplateResponse(request, template, context)
+
+
+@anonymous_cache_page(CACHE_DELAY, key_prefix='trending_page', query_params=())
+def trending(request):
+    template = 'posts/trending.html'
+    posts = trending_posts()
+    context = {
+        'posts': posts,
+        'groups': trending_groups(),
+        'followed': is_following(
+            request.user, [post.author for post in posts]
+        ),
+        'trending': True,
+    }
+    return TemplateResponse(request, template, context)
 
 
 def group_posts(request, slug):
     template = 'posts/group_list.html'
-    group = get_object_or_404(Group, slug=slug)
-    post_list = Post.objects.select_related(
-        'author'
-    ).filter(
-        group=group
-    )
+    group = get_cached_object_or_404(Group, slug=slug)
+    post_list = Post.objects.filter(group=group)
     page_number = request.GET.get('page')
-    page_obj = pages(post_list).get_page(page_number)
+    paginator = pages(
+        FeedRows(post_list), CachedCount(post_list, group_scope(group.pk))
+    )
+    page_obj = paginator.get_page(page_number)
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -40,41 +92,37 @@ def group_posts(request, slug):
 
 def profile(request, username):
     template = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
-    user_posts = Post.objects.select_related(
-        'group'
-    ).filter(
-        author=author
-    )
-    count_posts = user_posts.count()
+    author = get_cached_object_or_404(User, username=username)
+    user_posts = Post.objects.filter(author=author)
     page_number = request.GET.get('page')
-    page_obj = pages(user_posts).get_page(page_number)
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user
-    ).filter(
-        author=author
-    ).exists()
+    paginator = pages(
+        FeedRows(user_posts),
+        CachedCount(user_posts, author_scope(author.pk)),
+    )
+    page_obj = paginator.get_page(page_number)
     context = {
         'author': author,
-        'following': following,
+        'following': author.pk in following_ids(request.user),
+        'follow_stats': follow_stats(author),
         'page_obj': page_obj,
-        'count': count_posts,
+        'count': paginator.count,
+        'suggestions': suggested_authors(request.user),
     }
     return render(request, template, context)
 
 
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
-    comments = Comment.objects.filter(post=post.pk).select_related('author')
-    comment_form = CommentForm(request.POST or None)
-    count_posts = (
-        Post.objects.select_related(
-            'group'
-        ).filter(
-            author=post.author
-        ).count()
+    post = get_cached_object_or_404(Post, pk=post_id)
+    record_view(post.pk)
+    comments = CursorPage(
+        Comment.objects.filter(post=post.pk).select_related('author')
     )
+    comment_form = CommentForm(request.POST or None)
+    author_posts = Post.objects.filter(author=post.author_id)
+    count_posts = CachedCount(
+        author_posts, author_scope(post.author_id)
+    ).count()
     context = {
         'post': post,
         'count': count_posts,
@@ -84,6 +132,57 @@ def post_detail(request, post_id):
     return render(request, template, context)
 
 
+@require_safe
+def post_comments(request, post_id):
+    """Следующая страница комментариев для кнопки «Показать ещё»."""
+    template = 'posts/includes/comment_list.html'
+    post = get_cached_object_or_404(Post, pk=post_id)
+    try:
+        before = int(request.GET['before'])
+    except (KeyError, ValueError):
+        raise Http404
+    context = {
+        'post': post,
+        'comments': CursorPage(
+            Comment.objects.filter(post=post.pk).select_related('author'),
+            before,
+        ),
+    }
+    return render(request, template, context)
+
+
+def linked_posts(request, template, links, context):
+    """Лента по таблице связей: страница курсора, затем сами посты."""
+    page = CursorPage(
+        links, cursor_param(request), MAX_POSTS, key='post_id'
+    )
+    context.update(
+        posts=posts_by_ids([link.post_id for link in page]),
+        next_cursor=page.next_cursor,
+    )
+    return render(request, template, context)
+
+
+def tag_posts(request, name):
+    tag = get_cached_object_or_404(Tag, name=name.lower())
+    return linked_posts(
+        request,
+        'posts/linked_list.html',
+        PostTag.objects.filter(tag=tag).only('post'),
+        {'title': str(tag)},
+    )
+
+
+def mention_posts(request, username):
+    user = get_cached_object_or_404(User, username=username)
+    return linked_posts(
+        request,
+        'posts/linked_list.html',
+        Mention.objects.filter(user=user).only('post'),
+        {'title': f'Упоминания @{user.username}'},
+    )
+
+
 @login_required
 def post_create(request):
     template = 'posts/create_post.html'
@@ -97,6 +196,8 @@ def post_create(request):
             post = form.save(commit=False)
             post.author = request.user
             post.save()
+            index_post(post)
+            record_post(post)
             return redirect('posts:profile', username)
     context = {
         'form': form,
@@ -117,7 +218,7 @@ def post_edit(request, post_id):
         return redirect('posts:post_detail', post_id)
     if request.method == 'POST':
         if form.is_valid():
-            form.save()
+            index_post(form.save())
             return redirect('posts:post_detail', post_id)
     context = {
         'form': form,
@@ -135,49 +236,36 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
+        record_comment(comment)
     return redirect('posts:post_detail', post_id=post_id,)
 
 
 @login_required
 def follow_index(request):
     template = 'posts/follow.html'
-    no_subscriptions = not Follow.objects.filter(user=request.user).exists()
-    post_list = Post.objects.filter(
-        author__following__user=request.user
-    ).select_related(
-        'author', 'group'
-    )
+    feed = FollowFeed(request.user)
     page_number = request.GET.get('page')
-    page_obj = pages(post_list).get_page(page_number)
+    page_obj = pages(feed, HAS_NEXT).get_page(page_number)
     context = {
-        'no_subscriptions': no_subscriptions,
+        'no_subscriptions': not following_ids(request.user),
         'page_obj': page_obj,
+        'suggestions': suggested_authors(request.user),
     }
     return render(request, template, context)
 
 
 @login_required
 def profile_follow(request, username):
-    subscriber = get_object_or_404(User, username=request.user.username)
     author = get_object_or_404(User, username=username)
-    user_not_subscribed = not Follow.objects.filter(
-        user=request.user
-    ).filter(
-        author=author
-    ).exists()
-    if request.user.username != author.username and user_not_subscribed:
-        Follow.objects.create(user=subscriber, author=author)
+    if follow(request.user, author):
+        record_follow(author)
     return redirect('posts:profile', username=author.username)
 
 
 @login_required
 def profile_unfollow(request, username):
-    subscriber = get_object_or_404(User, username=request.user.username)
     author = get_object_or_404(User, username=username)
-    Follow.objects.filter(
-        user=subscriber
-    ).filter(
-        author=author
-    ).delete()
+    unfollow(request.user, author)
     return redirect('posts:profile', username=author.username)
@@ -77,6 +77,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.cache.fragment_cache',
             ],
         },
     },
@@ -135,6 +136,9 @@ USE_TZ = True
 STATIC_URL = '/static/'
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+STATICFILES_STORAGE = 'core.staticfiles.PrecompressedManifestStorage'
+STATIC_PRUNED_CSS = ('css/bootstrap.min.css',)
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -146,3 +150,24 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+MEDIA_SERVED_PREFIXES = ('posts/', 'cache/')
+# 'nginx' (X-Accel-Redirect) или 'apache' (X-Sendfile); None - отдавать самим.
+MEDIA_SENDFILE = None
+# internal-локация nginx, указывающая на MEDIA_ROOT.
+MEDIA_ACCEL_LOCATION = '/protected-media/'
+
+FRAGMENT_CACHE_TIMEOUT = 60 * 5
+
+THUMBNAIL_ENGINE = 'posts.thumbnails.DraftEngine'
+THUMBNAIL_MAX_DECODED_PIXELS = 24_000_000
+
+POST_IMAGE_MAX_SIDE = 2048
+POST_IMAGE_MAX_PIXELS = 40_000_000
+POST_IMAGE_QUALITY = 85
+
+# Популярное: за TRENDING_HALF_LIFE часов вес события уменьшается вдвое.
+TRENDING_HALF_LIFE = 24
+TRENDING_MIN_SCORE = 0.05
+
+# Просмотры копятся в памяти процесса и пишутся в базу раз в столько секунд.
+VIEW_FLUSH_INTERVAL = 10